@@ -1,6 +1,33 @@
-from django.contrib import admin
-from .models import Task
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from .models import Task, TaskStats
+from .purge import purge_user
 
 # Register your models here.
 
 admin.site.register(Task)
+admin.site.register(TaskStats)
+
+
+# The built in delete action cascades through every task of the users at once,
+# this one deletes their tasks in batches first (see core/purge.py).
+@admin.action(description="Purge selected users and their tasks in batches")
+def purge_users(modeladmin, request, queryset):
+    for user in queryset.exclude(pk=request.user.pk):
+        username = user.username
+        deleted = purge_user(user)
+        summary = ", ".join(f"{count} {label}" for label, count in deleted.items())
+        modeladmin.message_user(request, f"Purged {username}: {summary}")
+    if queryset.filter(pk=request.user.pk).exists():
+        modeladmin.message_user(
+            request, "You cannot purge your own account.", messages.WARNING
+        )
+
+
+class PurgeUserAdmin(UserAdmin):
+    actions = [purge_users]
+
+
+admin.site.unregister(User)
+admin.site.register(User, PurgeUserAdmin)
@@ -0,0 +1,167 @@
+from datetime import date, datetime, time, timedelta
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import ArchivedTask, DailyCompletionRollup, Task
+
+# Daily completion rollups. One day of completions is streamed from the task
+# and archive tables (task_completed_idx, archived_completion_idx) in chunks
+# into NumPy arrays, grouped by user and summarized; the dashboard then reads
+# a few hundred rollup rows instead of aggregating over all tasks.
+
+CHUNK_SIZE = 5000
+FIELDS = ("user_id", "date_created", "date_planned_completion", "date_completion")
+# a user id for tasks without a user, they only count in the totals
+NO_USER = -1
+# Hours to completion are also kept as a histogram per rollup, so percentiles
+# over several days come from the merged histograms instead of averaging the
+# daily medians. Bucket i covers [MIN_HOURS * 2**(i / STEPS), the next one),
+# bucket 0 from 0: eight buckets per doubling, within 9% of the true value.
+HISTOGRAM_MIN_HOURS = 1 / 60
+HISTOGRAM_STEPS = 8
+
+Histogram = Dict[str, int]
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    # days in TIME_ZONE, the same days the users see
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def completed_rows(start: datetime, end: datetime) -> Iterator[tuple]:
+    live = Task.objects.filter(
+        complete=True, date_completion__gte=start, date_completion__lt=end
+    )
+    archived = ArchivedTask.objects.filter(
+        date_completion__gte=start, date_completion__lt=end
+    )
+    for queryset in (live, archived):
+        yield from queryset.order_by().values_list(*FIELDS).iterator(CHUNK_SIZE)
+
+
+def to_arrays(rows: Iterable[tuple]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # user ids, hours to completion and on time state (-1 without a deadline),
+    # built chunk by chunk so only the arrays stay in memory, not the rows
+    users: List[np.ndarray] = []
+    hours: List[np.ndarray] = []
+    on_time: List[np.ndarray] = []
+    chunk: List[tuple] = []
+
+    def flush():
+        users.append(
+            np.fromiter((NO_USER if r[0] is None else r[0] for r in chunk), np.int64)
+        )
+        hours.append(
+            np.fromiter(((r[3] - r[1]).total_seconds() for r in chunk), np.float64)
+        )
+        on_time.append(
+            np.fromiter(
+                (-1 if r[2] is None else int(r[3] <= r[2]) for r in chunk), np.int8
+            )
+        )
+        chunk.clear()
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    if not users:
+        return np.empty(0, np.int64), np.empty(0), np.empty(0, np.int8)
+    seconds = np.concatenate(hours)
+    return np.concatenate(users), np.maximum(seconds, 0) / 3600, np.concatenate(on_time)
+
+
+def histogram(hours: np.ndarray) -> Histogram:
+    # sparse, {bucket: count} with string keys as the JSON column returns them
+    scaled = np.maximum(hours, HISTOGRAM_MIN_HOURS) / HISTOGRAM_MIN_HOURS
+    buckets = np.floor(np.log2(scaled) * HISTOGRAM_STEPS).astype(np.int64)
+    indexes, counts = np.unique(buckets, return_counts=True)
+    return {str(index): int(count) for index, count in zip(indexes, counts)}
+
+
+def bucket_bounds(index: int) -> Tuple[float, float]:
+    lower = 0.0 if index == 0 else HISTOGRAM_MIN_HOURS * 2 ** (index / HISTOGRAM_STEPS)
+    return lower, HISTOGRAM_MIN_HOURS * 2 ** ((index + 1) / HISTOGRAM_STEPS)
+
+
+def histogram_percentile(histograms: Iterable[Histogram], q: float) -> Optional[float]:
+    # q in [0, 1] of the merged histograms, interpolated within the bucket
+    merged: Counter = Counter()
+    for counts in histograms:
+        merged.update({int(index): count for index, count in counts.items()})
+    total = sum(merged.values())
+    if not total:
+        return None
+    rank, seen = q * total, 0
+    for index in sorted(merged):
+        count = merged[index]
+        if seen + count >= rank:
+            lower, upper = bucket_bounds(index)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return bucket_bounds(max(merged))[1]
+
+
+def summarize(
+    day: date, user_id: Optional[int], hours: np.ndarray, on_time: np.ndarray
+) -> DailyCompletionRollup:
+    median = p90 = None
+    if len(hours):
+        median, p90 = (float(value) for value in np.percentile(hours, [50, 90]))
+    return DailyCompletionRollup(
+        day=day,
+        user_id=user_id,
+        completed=len(hours),
+        with_deadline=int(np.count_nonzero(on_time >= 0)),
+        on_time=int(np.count_nonzero(on_time == 1)),
+        median_hours=median,
+        p90_hours=p90,
+        hours_histogram=histogram(hours),
+    )
+
+
+def rollup_day(day: date) -> int:
+    # replaces the rollups of the day, returns the number of completed tasks
+    users, hours, on_time = to_arrays(completed_rows(*day_bounds(day)))
+    rollups = [summarize(day, None, hours, on_time)]
+    order = np.argsort(users, kind="stable")
+    user_ids, starts = np.unique(users[order], return_index=True)
+    for user_id, indexes in zip(user_ids, np.split(order, starts[1:])):
+        if user_id != NO_USER:
+            rollups.append(
+                summarize(day, int(user_id), hours[indexes], on_time[indexes])
+            )
+    with transaction.atomic():
+        DailyCompletionRollup.objects.filter(day=day).delete()
+        DailyCompletionRollup.objects.bulk_create(rollups)
+    return len(hours)
+
+
+def first_pending_day() -> Optional[date]:
+    # the last rolled up day again, it may have been rolled up while running,
+    # else the day of the first completion
+    last = (
+        DailyCompletionRollup.objects.filter(user=None)
+        .order_by("-day")
+        .values_list("day", flat=True)
+        .first()
+    )
+    if last is not None:
+        return last
+    firsts = [
+        Task.objects.filter(complete=True).aggregate(first=Min("date_completion")),
+        ArchivedTask.objects.aggregate(first=Min("date_completion")),
+    ]
+    firsts = [row["first"] for row in firsts if row["first"] is not None]
+    if not firsts:
+        return None
+    return timezone.localdate(min(firsts))
@@ -0,0 +1,163 @@
+import json
+from typing import Any, Dict, List
+
+from django.forms import DateTimeField
+from django.core.exceptions import ValidationError
+from django.http import HttpRequest, JsonResponse
+from django.views.generic import View
+
+from .importer import build_task
+from .models import Task
+from .pagination import paginate_keyset
+from .sync import changes_since
+
+# JSON API for clients that sync many changes at once. Every batch endpoint runs
+# a fixed number of SQL statements no matter how many tasks are in the batch.
+
+API_MAX_BATCH = 1000
+API_PAGE_SIZE = 100
+TASK_API_FIELDS = [
+    "id",
+    "title",
+    "text",
+    "complete",
+    "date_created",
+    "date_planned_completion",
+    "date_completion",
+    "updated_at",
+]
+
+
+def task_to_dict(task: Task) -> Dict[str, Any]:
+    return {name: getattr(task, name) for name in TASK_API_FIELDS}
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400, **extra) -> None:
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+class TaskApiView(View):
+    # Session authenticated JSON view, errors are returned as {"error": ...}
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {"error": str(error), **error.extra}, status=error.status
+            )
+
+    def http_method_not_allowed(self, request, *args, **kwargs) -> JsonResponse:
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user)
+
+    def read_json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            raise ApiError("Body must be JSON")
+        if not isinstance(data, dict):
+            raise ApiError("Body must be a JSON object")
+        return data
+
+    def read_list(self, data: Dict[str, Any], key: str) -> List[Any]:
+        items = data.get(key)
+        if not isinstance(items, list) or not items:
+            raise ApiError(f"'{key}' must be a non empty list")
+        if len(items) > API_MAX_BATCH:
+            raise ApiError(f"At most {API_MAX_BATCH} items per request")
+        return items
+
+    def read_ids(self, data: Dict[str, Any]) -> List[int]:
+        ids = self.read_list(data, "ids")
+        if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise ApiError("'ids' must be a list of integers")
+        return ids
+
+
+class TaskListApi(TaskApiView):
+    # GET /api/tasks?cursor=... same ordering and keyset paging like the task list
+    def get(self, request, *args, **kwargs) -> JsonResponse:
+        tasks, next_cursor = paginate_keyset(
+            self.get_queryset(),
+            ["complete", "date_planned_completion", "pk"],
+            request.GET.get("cursor"),
+            API_PAGE_SIZE,
+        )
+        return JsonResponse(
+            {
+                "tasks": [task_to_dict(task) for task in tasks],
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+class TaskBatchCreateApi(TaskApiView):
+    # POST {"tasks": [{"title", "text", "date_planned_completion", "complete"}, ...]}
+    # all tasks are validated first, nothing is created when one of them is invalid
+    def post(self, request, *args, **kwargs) -> JsonResponse:
+        rows = self.read_list(self.read_json(), "tasks")
+        tasks, errors = [], {}
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = ["Task must be a JSON object"]
+                continue
+            task, row_errors = build_task(row, request.user)
+            if row_errors:
+                errors[index] = row_errors
+            else:
+                tasks.append(task)
+        if errors:
+            raise ApiError("Invalid tasks", errors=errors)
+        created = Task.objects.bulk_create(tasks)
+        return JsonResponse(
+            {"tasks": [task_to_dict(task) for task in created]}, status=201
+        )
+
+
+class TaskBatchUpdateApi(TaskApiView):
+    # POST {"ids": [...], "complete": bool, "date_planned_completion": datetime}
+    # one UPDATE for all listed tasks of the user
+    def post(self, request, *args, **kwargs) -> JsonResponse:
+        data = self.read_json()
+        ids = self.read_ids(data)
+        changes = {}
+        if "complete" in data:
+            if not isinstance(data["complete"], bool):
+                raise ApiError("'complete' must be true or false")
+            changes["complete"] = data["complete"]
+        if "date_planned_completion" in data:
+            try:
+                changes["date_planned_completion"] = DateTimeField(
+                    required=False
+                ).clean(data["date_planned_completion"])
+            except ValidationError:
+                raise ApiError("'date_planned_completion' is not a valid date")
+        if not changes:
+            raise ApiError("Nothing to update")
+        updated = self.get_queryset().filter(pk__in=ids).update(**changes)
+        return JsonResponse({"updated": updated})
+
+
+class TaskBatchDeleteApi(TaskApiView):
+    # POST {"ids": [...]}, one DELETE for all listed tasks of the user
+    def post(self, request, *args, **kwargs) -> JsonResponse:
+        ids = self.read_ids(self.read_json())
+        deleted, _ = self.get_queryset().filter(pk__in=ids).delete()
+        return JsonResponse({"deleted": deleted})
+
+
+class TaskSyncApi(TaskApiView):
+    # GET /api/tasks/sync?cursor=... tasks created or changed and ids of tasks
+    # deleted since the cursor; "reset" means the client has to sync from scratch.
+    # The last SYNC_OVERLAP_SECONDS of a finished sync come again, apply by id.
+    def get(self, request, *args, **kwargs) -> JsonResponse:
+        changes = changes_since(request.user, request.GET.get("cursor"))
+        changes["changed"] = [task_to_dict(task) for task in changes["changed"]]
+        return JsonResponse(changes)
@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def install_search_triggers(using="default", **kwargs):
+    from .search import install_triggers
+
+    install_triggers(using)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        # schema changes on SQLite rebuild core_task and drop its FTS triggers
+        post_migrate.connect(install_search_triggers, sender=self)
+        # deployment checks, see core/checks.py
+        from . import checks  # noqa: F401
+
+        # query counts and SQL time per request, see core/metrics.py
+        from .metrics import install_sql_wrapper
+        from .writes import configure_sqlite
+
+        connection_created.connect(install_sql_wrapper)
+        # WAL and busy timeout for every SQLite connection
+        connection_created.connect(configure_sqlite)
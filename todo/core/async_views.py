@@ -0,0 +1,105 @@
+from typing import Any, Dict, Union
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.generic import View
+
+from .api import API_PAGE_SIZE, task_to_dict
+from .models import Task, TaskStats
+from .pagination import apaginate_keyset
+from .sync import changes_since
+from .views import TaskListView
+
+# Async versions of the read endpoints. Under ASGI they run on the event loop
+# and only the ORM calls leave it, so a slow client does not hold a worker
+# thread. Served by todo/asgi.py, see the notes there.
+
+
+async def aget_user(request: HttpRequest) -> Union[AbstractBaseUser, AnonymousUser]:
+    # request.user is lazy and would query the database from the template,
+    # load it once here and replace the lazy object
+    user = await sync_to_async(get_user)(request)
+    request.user = user
+    return user
+
+
+def _render_task_list(request: HttpRequest, context: Dict[str, Any]) -> HttpResponse:
+    context["task_rows"] = mark_safe(
+        render_to_string("task_rows.html", {"tasks": context["tasks"]}, request)
+    )
+    return render(request, "task.html", context)
+
+
+class AsyncTaskListView(View):
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        cursor = request.GET.get("cursor")
+        tasks, next_cursor = await apaginate_keyset(
+            Task.objects.filter(user=user),
+            TaskListView.ordering,
+            cursor,
+            TaskListView.page_size,
+        )
+        stats = await TaskStats.objects.filter(user=user).afirst()
+        if stats is None:
+            stats = await sync_to_async(TaskStats.for_user)(user)
+        context = {
+            "tasks": tasks,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "count": stats.incomplete,
+            "done": stats.complete,
+        }
+        return await sync_to_async(_render_task_list)(request, context)
+
+
+class AsyncTaskDetailView(View):
+    async def get(self, request: HttpRequest, pk: int, *args, **kwargs) -> HttpResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        try:
+            task = await Task.objects.aget(pk=pk, user=user)
+        except Task.DoesNotExist:
+            raise Http404("Task does not exist")
+        return await sync_to_async(render)(request, "detail_task.html", {"task": task})
+
+
+class AsyncTaskListApi(View):
+    # GET /api/async/tasks?cursor=...&count=1, the total is counted only on request
+    async def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        queryset = Task.objects.filter(user=user)
+        tasks, next_cursor = await apaginate_keyset(
+            queryset,
+            TaskListView.ordering,
+            request.GET.get("cursor"),
+            API_PAGE_SIZE,
+        )
+        data = {
+            "tasks": [task_to_dict(task) for task in tasks],
+            "next_cursor": next_cursor,
+        }
+        if request.GET.get("count"):
+            data["count"] = await queryset.acount()
+        return JsonResponse(data)
+
+
+class AsyncTaskSyncApi(View):
+    async def get(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        changes = await sync_to_async(changes_since)(user, request.GET.get("cursor"))
+        changes["changed"] = [task_to_dict(task) for task in changes["changed"]]
+        return JsonResponse(changes)
@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base
+
+# SQLite with transactions that take the write lock when they begin. Django
+# starts them DEFERRED: the first read takes a snapshot, and the first write of
+# that transaction fails with "database is locked" right away if another
+# connection wrote since, busy_timeout does not apply to the upgrade. The task
+# writes read the rows and counters they change first, so they begin IMMEDIATE
+# and wait for the lock (busy_timeout) instead. Django 5.1 has this built in,
+# OPTIONS {"transaction_mode": "IMMEDIATE"}.
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
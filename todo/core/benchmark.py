@@ -0,0 +1,76 @@
+import math
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+
+# Helpers of the benchmark command: run one request many times and summarize
+# latency, queries and allocated memory.
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    # nearest rank, no interpolation between the measured values
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(
+    request: Callable[[], HttpResponse], repeat: int, memory_repeat: int = 5
+) -> Dict[str, Any]:
+    timings: List[float] = []
+    queries: List[int] = []
+    statuses: Dict[str, int] = {}
+    for i in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            timings.append(time.perf_counter() - start)
+        # the captured list is reset by the next request, read it now
+        queries.append(len(captured.captured_queries))
+        status = str(response.status_code)
+        statuses[status] = statuses.get(status, 0) + 1
+    # tracemalloc slows every allocation down, so memory gets its own few runs
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(memory_repeat):
+            tracemalloc.reset_peak()
+            request()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    result = {
+        "requests": repeat,
+        "status": statuses,
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}_ms"] = round(percentile(timings, percent) * 1000, 3)
+    result.update(
+        queries_min=min(queries),
+        queries_max=max(queries),
+        queries_mean=round(sum(queries) / len(queries), 2),
+        peak_memory_kib=round(max(peaks, default=0) / 1024, 1),
+    )
+    return result
+
+
+def time_render(render: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    return {
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+    }
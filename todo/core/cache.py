@@ -0,0 +1,74 @@
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Per user version of the task list. Every write to the tasks of a user bumps
+# the version, cached fragments have the version in their key so old entries
+# are never read again and simply expire.
+
+
+def _version_key(user_id: int) -> str:
+    return f"tasks:version:{user_id}"
+
+
+def _new_version() -> int:
+    # milliseconds, a version lost from the cache never comes back with an old number
+    return int(time.time() * 1000)
+
+
+def get_task_version(user_id: int) -> int:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _new_version()
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def bump_task_versions(user_ids: Iterable[Optional[int]]) -> None:
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), _new_version(), None)
+
+
+def tasks_changed(user_ids: Iterable[Optional[int]]) -> None:
+    # bump now and again after commit, readers that cached the old rows while
+    # the transaction was still open get a new version as well
+    user_ids = set(user_ids)
+    bump_task_versions(user_ids)
+    transaction.on_commit(lambda: bump_task_versions(user_ids))
+
+
+# Callers build the key once, before reading the rows: a write committing in
+# between bumps the version, so the page stored under the old key is never read.
+def task_list_key(user_id: int, cursor: Optional[str]) -> str:
+    return f"tasks:list:{user_id}:{get_task_version(user_id)}:{cursor or ''}"
+
+
+def get_task_list(key: str) -> Optional[Dict[str, Any]]:
+    return cache.get(key)
+
+
+def set_task_list(key: str, page: Dict[str, Any]) -> None:
+    cache.set(key, page, settings.TASK_LIST_CACHE_TIMEOUT)
+
+
+def task_object_key(user_id: int, pk: int) -> str:
+    return f"tasks:object:{user_id}:{get_task_version(user_id)}:{pk}"
+
+
+def get_task_object(key: str) -> Any:
+    return cache.get(key)
+
+
+def set_task_object(key: str, task: Any) -> None:
+    # any write to the tasks of the user bumps the version, the entry is never
+    # read again after a save or delete
+    cache.set(key, task, settings.TASK_OBJECT_CACHE_TIMEOUT)
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Deployment checks of the settings this app relies on.
+
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # cache versions, cached pages and throttle buckets must be seen by all processes
+    if settings.CACHES["default"]["BACKEND"] in PER_PROCESS_CACHES:
+        return [
+            Warning(
+                "The default cache is per process.",
+                hint=(
+                    "Task list pages and cached tasks are invalidated only in the "
+                    "process that wrote the tasks. Set TODO_REDIS_URL or "
+                    "TODO_CACHE_DIR when more than one process serves or writes "
+                    "tasks."
+                ),
+                id="core.W001",
+            )
+        ]
+    return []
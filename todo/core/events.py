@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Task change events per user, pushed to open task lists by the SSE endpoint
+# (core/sse.py). The write hooks of Task and TaskQuerySet publish after commit,
+# the broker backend (settings.TASK_EVENTS_BACKEND) fans them out:
+# InProcessBackend for one process, CacheBackend through the shared cache when
+# several worker processes serve the events.
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = ("id", "title", "complete", "is_overdue", "date_planned_completion")
+# more tasks than this in one write and the clients reload the page instead
+EVENT_TASK_LIMIT = 200
+
+Event = Dict[str, Any]
+
+
+class InProcessBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, Any]]] = (
+            defaultdict(set)
+        )
+
+    def publish(self, user_id: int, event: Event) -> None:
+        # called from any thread, queues live on the event loop of the subscriber
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    async def subscribe(self, user_id: int) -> AsyncIterator[Event]:
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self.lock:
+            self.subscribers[user_id].add(subscriber)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            with self.lock:
+                self.subscribers[user_id].discard(subscriber)
+                if not self.subscribers[user_id]:
+                    del self.subscribers[user_id]
+
+
+class CacheBackend:
+    # Every event is stored under a per user sequence number and subscribers
+    # poll for new numbers. Works with any cache all processes share.
+    poll_interval = 0.5
+    timeout = 60
+
+    def _key(self, user_id: int, name: Any) -> str:
+        return f"tasks:events:{user_id}:{name}"
+
+    def publish(self, user_id: int, event: Event) -> None:
+        key = self._key(user_id, "seq")
+        cache.add(key, 0, None)
+        seq = cache.incr(key)
+        cache.set(self._key(user_id, seq), event, self.timeout)
+
+    async def subscribe(self, user_id: int) -> AsyncIterator[Event]:
+        seq = await cache.aget(self._key(user_id, "seq"), 0)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            last = await cache.aget(self._key(user_id, "seq"), 0)
+            if last <= seq:
+                continue
+            keys = [self._key(user_id, number) for number in range(seq + 1, last + 1)]
+            events = await cache.aget_many(keys)
+            for key in keys:
+                if key in events:
+                    yield events[key]
+            seq = last
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.TASK_EVENTS_BACKEND)()
+        return _backend
+
+
+def encode_event(event: Event) -> str:
+    return json.dumps(event, cls=DjangoJSONEncoder)
+
+
+def publish(user_id: Optional[int], event: Event) -> None:
+    if user_id is not None:
+        get_backend().publish(user_id, event)
+
+
+def task_data(task) -> Dict[str, Any]:
+    return {name: getattr(task, name) for name in EVENT_FIELDS}
+
+
+def publish_tasks(kind: str, tasks: Iterable[Tuple[Optional[int], Event]]) -> None:
+    # tasks are (user id, task data) pairs
+    by_user: Dict[int, List[Event]] = defaultdict(list)
+    for user_id, data in tasks:
+        by_user[user_id].append(data)
+    for user_id, data in by_user.items():
+        if len(data) > EVENT_TASK_LIMIT or any(task["id"] is None for task in data):
+            publish(user_id, {"type": "reload"})
+        else:
+            publish(user_id, {"type": kind, "tasks": data})
+
+
+def publish_ids(kind: str, tasks: Iterable[Tuple[int, Optional[int]]]) -> None:
+    # tasks are (task id, user id) pairs
+    by_user: Dict[int, List[int]] = defaultdict(list)
+    for task_id, user_id in tasks:
+        by_user[user_id].append(task_id)
+    for user_id, ids in by_user.items():
+        if len(ids) > EVENT_TASK_LIMIT:
+            publish(user_id, {"type": "reload"})
+        else:
+            publish(user_id, {"type": kind, "ids": ids})
+
+
+def after_commit(func: Callable[[], None]) -> None:
+    # live updates are best effort, a failing publish must not fail the commit
+    def run():
+        try:
+            func()
+        except Exception:
+            logger.exception("Publishing task event failed")
+
+    if settings.TASK_EVENTS:
+        transaction.on_commit(run)
+
+
+def tasks_event(kind: str, tasks: Iterable) -> None:
+    # created and updated tasks, with the row data the task list shows
+    if settings.TASK_EVENTS:
+        data = [(task.user_id, task_data(task)) for task in tasks]
+        after_commit(lambda: publish_tasks(kind, data))
+
+
+def changed_tasks_event(fetch: Callable[[], Iterable]) -> None:
+    # queryset updates do not have the rows, fetch() reads them after the commit
+    if settings.TASK_EVENTS:
+        after_commit(
+            lambda: publish_tasks(
+                "updated", [(task.user_id, task_data(task)) for task in fetch()]
+            )
+        )
+
+
+def task_ids_event(kind: str, tasks: Iterable[Tuple[int, Optional[int]]]) -> None:
+    # deleted and overdue tasks, the ids are enough
+    if settings.TASK_EVENTS:
+        tasks = list(tasks)
+        after_commit(lambda: publish_ids(kind, tasks))
+
+
+def reload_event(user_ids: Iterable[Optional[int]]) -> None:
+    if not settings.TASK_EVENTS:
+        return
+    user_ids = set(user_ids)
+
+    def reload():
+        for user_id in user_ids:
+            publish(user_id, {"type": "reload"})
+
+    after_commit(reload)
@@ -0,0 +1,98 @@
+import csv
+import json
+from typing import Any, Dict, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+# Streaming export of tasks. Rows are read in keyset chunks ordered by pk so
+# memory stays flat and no long running read is kept open between chunks. The
+# archived tasks (ArchivedTask) follow the live ones with archived set, with
+# their original task id, so an export is a backup of everything.
+
+EXPORT_FIELDS = [
+    "id",
+    "user",
+    "title",
+    "text",
+    "date_created",
+    "complete",
+    "date_planned_completion",
+    "date_completion",
+    "archived",
+]
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _chunked_rows(
+    queryset: QuerySet, columns: Dict[str, str], constants: Dict[str, Any]
+) -> Iterator[Dict[str, Any]]:
+    # columns maps export fields to the columns they are read from, constants
+    # has the values of the others
+    queryset = queryset.order_by("pk").values_list("pk", *columns.values())
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:EXPORT_CHUNK_SIZE])
+        for pk, *values in chunk:
+            row = dict(zip(columns, values), **constants)
+            yield {name: row[name] for name in EXPORT_FIELDS}
+        if len(chunk) < EXPORT_CHUNK_SIZE:
+            return
+        last_pk = chunk[-1][0]
+
+
+def export_rows(
+    queryset: QuerySet, archived: Optional[QuerySet] = None
+) -> Iterator[Dict[str, Any]]:
+    # queryset of Task, then archived of ArchivedTask
+    columns = {name: name for name in EXPORT_FIELDS if name != "archived"}
+    columns["user"] = "user__username"
+    yield from _chunked_rows(queryset, columns, {"archived": False})
+    if archived is not None:
+        del columns["complete"]
+        columns["id"] = "task_id"
+        yield from _chunked_rows(
+            archived, columns, {"complete": True, "archived": True}
+        )
+
+
+class _Echo:
+    # csv.writer writes into this and we hand the line to the response
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_ndjson(
+    queryset: QuerySet, archived: Optional[QuerySet] = None
+) -> Iterator[str]:
+    for row in export_rows(queryset, archived):
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def iter_csv(queryset: QuerySet, archived: Optional[QuerySet] = None) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset, archived):
+        yield writer.writerow(
+            [
+                "" if row[name] is None else _csv_value(row[name])
+                for name in EXPORT_FIELDS
+            ]
+        )
+
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def iter_export(
+    queryset: QuerySet, export_format: str, archived: Optional[QuerySet] = None
+) -> Iterator[str]:
+    # queryset of Task, archived of ArchivedTask with the same owner filter
+    if export_format == "csv":
+        return iter_csv(queryset, archived)
+    return iter_ndjson(queryset, archived)
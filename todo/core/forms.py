@@ -1,6 +1,20 @@
+from typing import List
 from django import forms
 from .models import Task, User
 
+TITLE_MIN_LENGTH = 4
+TEXT_MIN_LENGTH = 10
+
+
+# the length rules of a task, shared by the form views and the bulk import
+def task_length_errors(title: str, text: str) -> List[str]:
+    errors = []
+    if len(title) < TITLE_MIN_LENGTH:
+        errors.append(f"Title must be at least {TITLE_MIN_LENGTH} characters long")
+    if len(text) < TEXT_MIN_LENGTH:
+        errors.append(f"Text must be at least {TEXT_MIN_LENGTH} characters long")
+    return errors
+
 
 class TaskForm(forms.ModelForm):
     date_planned_completion = forms.DateTimeField(
@@ -13,6 +27,7 @@ class TaskForm(forms.ModelForm):
             }
         ),
     )
+
     # user = forms.ModelChoiceField(queryset=User.objects.all())
     class Meta:
         model = Task
@@ -34,3 +49,47 @@ class TaskUpdateForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = ["title", "text", "date_planned_completion", "complete"]
+
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField()
+    format = forms.ChoiceField(choices=[("csv", "CSV"), ("ndjson", "NDJSON")])
+
+
+BULK_ACTION_LIMIT = 1000
+
+
+class TaskIdsField(forms.Field):
+    # checked task boxes, every one posts a tasks=<id> value
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value) -> List[int]:
+        try:
+            ids = {int(task_id) for task_id in value or []}
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid task selection")
+        if len(ids) > BULK_ACTION_LIMIT:
+            raise forms.ValidationError(
+                f"Select at most {BULK_ACTION_LIMIT} tasks at once"
+            )
+        return sorted(ids)
+
+
+class TaskBulkActionForm(forms.Form):
+    action = forms.ChoiceField(
+        choices=[
+            ("complete", "Mark complete"),
+            ("deadline", "Set deadline"),
+            ("delete", "Delete"),
+        ]
+    )
+    tasks = TaskIdsField()
+    date_planned_completion = forms.DateTimeField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("action") == "deadline" and not cleaned_data.get(
+            "date_planned_completion"
+        ):
+            self.add_error("date_planned_completion", "Choose the new deadline")
+        return cleaned_data
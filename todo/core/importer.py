@@ -0,0 +1,115 @@
+import csv
+import json
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .forms import TaskForm, task_length_errors
+from .models import Task
+
+# Bulk import of tasks from CSV (header row) or NDJSON (one object per line).
+# Every row goes through TaskForm and the same length rules as the form views,
+# valid rows are inserted with bulk_create in batches, one transaction per batch.
+
+IMPORT_BATCH_SIZE = 1000
+# rejected rows listed with their errors, the rest are only counted
+IMPORT_MAX_ERRORS = 50
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class ImportResult:
+    def __init__(self) -> None:
+        self.created = 0
+        self.rejected = 0
+        # (line number, error messages) of the first IMPORT_MAX_ERRORS rejected rows
+        self.errors: List[Tuple[int, List[str]]] = []
+        # the file stopped being readable (encoding, broken CSV) after this
+        # line; the valid rows before it are imported, the rest is not
+        self.read_error: Optional[Tuple[int, str]] = None
+
+    def reject(self, line_number: int, errors: List[str]) -> None:
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append((line_number, errors))
+
+
+def read_rows(
+    stream: IO[str], import_format: str
+) -> Iterator[Tuple[int, Optional[Dict]]]:
+    # yields (line number, row); row is None when the line cannot be parsed
+    if import_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def build_task(row: Dict, user: User) -> Tuple[Optional[Task], List[str]]:
+    form = TaskForm(
+        data={
+            "title": row.get("title") or "",
+            "text": row.get("text") or "",
+            "date_planned_completion": row.get("date_planned_completion") or "",
+        }
+    )
+    if not form.is_valid():
+        return None, [
+            f"{field}: {message}"
+            for field, messages in form.errors.items()
+            for message in messages
+        ]
+    errors = task_length_errors(form.cleaned_data["title"], form.cleaned_data["text"])
+    if errors:
+        return None, errors
+    task = form.save(commit=False)
+    task.user = user
+    task.complete = str(row.get("complete", "")).strip().lower() in TRUE_VALUES
+    return task, []
+
+
+def import_tasks(
+    stream: IO[str],
+    user: User,
+    import_format: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportResult:
+    result = ImportResult()
+    batch: List[Task] = []
+    rows = read_rows(stream, import_format)
+    line_number = 0
+    while True:
+        try:
+            line_number, row = next(rows)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as exc:
+            result.read_error = (line_number, str(exc))
+            break
+        if row is None:
+            result.reject(line_number, ["Line is not a valid JSON object"])
+            continue
+        task, errors = build_task(row, user)
+        if errors:
+            result.reject(line_number, errors)
+            continue
+        batch.append(task)
+        if len(batch) >= batch_size:
+            result.created += _insert(batch)
+            batch = []
+    if batch:
+        result.created += _insert(batch)
+    return result
+
+
+def _insert(batch: List[Task]) -> int:
+    with transaction.atomic():
+        return len(Task.objects.bulk_create(batch))
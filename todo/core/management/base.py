@@ -0,0 +1,44 @@
+import time
+from typing import Callable, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class BatchCommand(BaseCommand):
+    # Maintenance commands that write in short transactions: --batch-size rows
+    # each (unless batch_size is None) and --pause seconds of sleep between
+    # them, so the web workers get the SQLite write lock in between.
+    batch_size: Optional[int] = 500
+    # what the pause is between, for the help text
+    pause_between = "batches"
+
+    def add_arguments(self, parser):
+        if self.batch_size is not None:
+            parser.add_argument("--batch-size", type=int, default=self.batch_size)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help=(
+                f"Seconds to sleep between {self.pause_between} so other "
+                "writers get the lock."
+            ),
+        )
+
+    def execute(self, *args, **options):
+        if options.get("batch_size", 1) < 1:
+            raise CommandError("--batch-size must be positive")
+        if options.get("pause", 0) < 0:
+            raise CommandError("--pause must not be negative")
+        return super().execute(*args, **options)
+
+    def run_batches(self, batch: Callable[[], int], pause: float) -> int:
+        # calls batch() until it returns 0, returns the sum of what it returned
+        total = 0
+        while True:
+            done = batch()
+            if not done:
+                return total
+            total += done
+            if pause:
+                time.sleep(pause)
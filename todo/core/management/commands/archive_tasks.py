@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from core.management.base import BatchCommand
+from core.models import ArchivedTask
+
+
+class Command(BatchCommand):
+    help = "Move tasks completed more than --days days ago into the archive."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--days", type=int, default=90)
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        archived = self.run_batches(
+            lambda: ArchivedTask.archive(cutoff, options["batch_size"]),
+            options["pause"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} tasks"))
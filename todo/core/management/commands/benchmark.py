@@ -0,0 +1,134 @@
+import json
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import PERCENTILES, measure
+from core.models import Task
+from core.purge import purge_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main pages many times in process and write p50/p95/p99 "
+        "latency, queries per request and peak memory as JSON. Seed data with "
+        "seed_tasks first. Writes commit, with their fsync, as a temporary user "
+        "that is purged afterwards, so runs stay comparable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default="bench_user_0")
+        parser.add_argument(
+            "--staff-user", help="User for /userlist, the first staff user by default."
+        )
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--memory-requests", type=int, default=5)
+        parser.add_argument("--output", default="benchmark.json")
+
+    def client_for(self, user: User) -> Client:
+        hosts = [host for host in settings.ALLOWED_HOSTS if host not in ("*", "")]
+        host = hosts[0].lstrip(".") if hosts else "localhost"
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+        self.clients.append(client)
+        return client
+
+    def endpoints(
+        self, user: User, staff: User, writer: User
+    ) -> List[Tuple[str, Callable[[], HttpResponse]]]:
+        client = self.client_for(user)
+        task = Task.objects.filter(user=user).order_by("pk").first()
+        if task is None:
+            raise CommandError(f"User {user.username} has no tasks, run seed_tasks")
+        # the writes go to the writer's own task list, the seeded one stays
+        writer_client = self.client_for(writer)
+        written = Task.objects.create(
+            user=writer, title="Benchmark task", text="Edited by the benchmark"
+        )
+        form = {
+            "title": "Benchmark task",
+            "text": "Written by the benchmark command",
+            "date_planned_completion": "2030-01-01T12:00",
+        }
+        endpoints = [
+            ("task", lambda: client.get(reverse("task"))),
+            (
+                "detail_task",
+                lambda: client.get(reverse("detail_task", args=[task.pk])),
+            ),
+            ("add_task", lambda: writer_client.post(reverse("add_task"), form)),
+            (
+                "edit_task",
+                lambda: writer_client.post(
+                    reverse("edit_task", args=[written.pk]), form
+                ),
+            ),
+        ]
+        if staff is not None:
+            staff_client = self.client_for(staff)
+            endpoints.insert(
+                1, ("userlist", lambda: staff_client.get(reverse("userlist")))
+            )
+        return endpoints
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be positive")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        if options["staff_user"]:
+            staff = User.objects.filter(
+                username=options["staff_user"], is_staff=True
+            ).first()
+            if staff is None:
+                raise CommandError(f"{options['staff_user']} is not a staff user")
+        else:
+            staff = User.objects.filter(is_staff=True).order_by("pk").first()
+            if staff is None:
+                self.stderr.write("No staff user, /userlist is skipped")
+        results: Dict[str, Dict] = {}
+        # no wrapping transaction, the writes are measured with their commit;
+        # the write coalescer's thread could not get the lock past one either
+        self.clients: List[Client] = []
+        writer = User.objects.create_user(f"benchmark_writer_{uuid.uuid4().hex[:8]}")
+        try:
+            for name, request in self.endpoints(user, staff, writer):
+                results[name] = measure(
+                    request, options["requests"], options["memory_requests"]
+                )
+                line = " ".join(
+                    f"p{percent}={results[name][f'p{percent}_ms']}ms"
+                    for percent in PERCENTILES
+                )
+                self.stdout.write(
+                    f"{name:<12} {line} queries={results[name]['queries_mean']} "
+                    f"memory={results[name]['peak_memory_kib']}KiB"
+                )
+        finally:
+            for client in self.clients:
+                client.logout()
+            # its tasks and cached pages go with it (purge bumps the versions)
+            purge_user(writer)
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "write_coalescing": settings.TASK_WRITE_COALESCING,
+            "user": user.username,
+            "users": User.objects.count(),
+            "tasks": Task.objects.count(),
+            "user_tasks": Task.objects.filter(user=user).count(),
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,73 @@
+import json
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from django.utils import timezone
+
+from core.benchmark import time_render
+from core.models import Task
+from core.templatetags.task_tags import render_task_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rendering the task rows with the template loop "
+        "(task_rows_reference.html) and with the task_rows tag. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Also write the results as JSON.")
+
+    def make_tasks(self, rows: int):
+        rng = random.Random(1)
+        now = timezone.now()
+        tasks = []
+        for pk in range(1, rows + 1):
+            deadline = None
+            if rng.random() < 0.8:
+                deadline = now + timedelta(hours=rng.uniform(-100, 500))
+            complete = rng.random() < 0.5
+            tasks.append(
+                Task(
+                    pk=pk,
+                    title=f"Task <{pk}> & co",
+                    text="Benchmark task",
+                    complete=complete,
+                    date_planned_completion=deadline,
+                    is_overdue=not complete and deadline is not None and deadline < now,
+                )
+            )
+        return tasks
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1 or options["repeat"] < 1:
+            raise CommandError("--rows and --repeat must be positive")
+        tasks = self.make_tasks(options["rows"])
+        reference = get_template("task_rows_reference.html")
+        results = {
+            "rows": options["rows"],
+            "template": time_render(
+                lambda: reference.render({"tasks": tasks}), options["repeat"]
+            ),
+            "tag": time_render(lambda: render_task_rows(tasks), options["repeat"]),
+        }
+        for name in ("template", "tag"):
+            results[name]["per_row_us"] = round(
+                results[name]["mean_ms"] * 1000 / options["rows"], 2
+            )
+        results["speedup"] = round(
+            results["template"]["mean_ms"] / max(results["tag"]["mean_ms"], 1e-6), 1
+        )
+        for name in ("template", "tag"):
+            self.stdout.write(
+                f"{name:<9} {results[name]['mean_ms']}ms per page, "
+                f"{results[name]['per_row_us']}us per row"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{results['speedup']}x faster"))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2)
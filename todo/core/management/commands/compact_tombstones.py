@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.management.base import BatchCommand
+from core.models import TaskTombstone
+
+
+class Command(BatchCommand):
+    batch_size = 1000
+    help = "Delete tombstones of deleted tasks that are older than the sync retention."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SYNC_TOMBSTONE_RETENTION_DAYS,
+            help="Keep tombstones younger than this many days.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        old = TaskTombstone.objects.filter(deleted_at__lt=cutoff)
+
+        def delete_batch() -> int:
+            batch = list(old.values_list("pk", flat=True)[: options["batch_size"]])
+            return TaskTombstone.objects.filter(pk__in=batch).delete()[0]
+
+        deleted = self.run_batches(delete_batch, options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones"))
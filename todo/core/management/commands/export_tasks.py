@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import EXPORT_FORMATS, iter_export
+from core.models import ArchivedTask, Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream tasks of one user (or of all users) as NDJSON or CSV, the "
+        "archived tasks included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", help="Username, all tasks are exported without it."
+        )
+        parser.add_argument(
+            "--format", choices=sorted(EXPORT_FORMATS), default="ndjson"
+        )
+        parser.add_argument("--output", help="File to write to, stdout by default.")
+
+    def handle(self, *args, **options):
+        queryset = Task.objects.all()
+        archived = ArchivedTask.objects.all()
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+            queryset = queryset.filter(user=user)
+            archived = archived.filter(user=user)
+        lines = iter_export(queryset, options["format"], archived)
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
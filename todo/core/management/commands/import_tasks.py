@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import IMPORT_BATCH_SIZE, import_tasks
+
+
+class Command(BaseCommand):
+    help = "Import tasks for a user from a CSV or NDJSON file in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--user", required=True, help="Owner of the imported tasks."
+        )
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Format of the file, taken from the file extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        import_format = options["format"] or (
+            "csv" if options["path"].endswith(".csv") else "ndjson"
+        )
+        with open(options["path"], newline="", encoding="utf-8-sig") as stream:
+            result = import_tasks(stream, user, import_format, options["batch_size"])
+        for line_number, errors in result.errors:
+            self.stderr.write(f"line {line_number}: {'; '.join(errors)}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(
+                f"{result.rejected - len(result.errors)} more rows rejected"
+            )
+        if result.read_error:
+            line_number, error = result.read_error
+            self.stderr.write(
+                f"File could not be read after line {line_number} ({error}), "
+                "the rest of the file was not imported"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} tasks, {result.rejected} rows rejected"
+            )
+        )
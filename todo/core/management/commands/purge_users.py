@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+from core.management.base import BatchCommand
+from core.purge import PURGE_BATCH_SIZE, purge_user
+
+
+class Command(BatchCommand):
+    batch_size = PURGE_BATCH_SIZE
+    help = "Delete users with all their tasks, in batches instead of one cascade."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("usernames", nargs="+")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        users = list(User.objects.filter(username__in=options["usernames"]))
+        missing = set(options["usernames"]) - {user.username for user in users}
+        if missing:
+            raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+        for user in users:
+            username = user.username
+            deleted = purge_user(
+                user,
+                options["batch_size"],
+                options["pause"],
+                progress=self.report,
+            )
+            summary = ", ".join(f"{count} {label}" for label, count in deleted.items())
+            self.stdout.write(self.style.SUCCESS(f"Purged {username}: {summary}"))
+
+    def report(self, user, label, count):
+        if self.verbosity >= 1:
+            self.stdout.write(f"{user.username}: {count} {label} deleted")
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import STAT_FIELDS, TaskStats
+
+
+class Command(BaseCommand):
+    help = "Recount the per user task counters (TaskStats) and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted counters, exit with an error if there are any.",
+        )
+        parser.add_argument("--user", help="Username of a single user to check.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+        user_ids = list(users.values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        drifted = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            stored = {
+                stats.pk: stats for stats in TaskStats.objects.filter(pk__in=batch)
+            }
+            for user_id, counts in TaskStats.compute(batch).items():
+                stats = stored.get(user_id)
+                current = {
+                    name: getattr(stats, name) if stats else 0 for name in STAT_FIELDS
+                }
+                expected = {name: counts[name] for name in STAT_FIELDS}
+                if current != expected:
+                    drifted += 1
+                    self.stdout.write(
+                        f"user {user_id}: stored {current}, counted {expected}"
+                    )
+            if not options["check"]:
+                TaskStats.rebuild(batch)
+        if options["check"] and drifted:
+            raise CommandError(f"{drifted} users have drifted task counters")
+        action = "found" if options["check"] else "repaired"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {len(user_ids)} users, {action} {drifted} drifted"
+            )
+        )
@@ -0,0 +1,49 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from core.analytics import first_pending_day, rollup_day
+from core.management.base import BatchCommand
+
+
+class Command(BatchCommand):
+    # one day per transaction
+    batch_size = None
+    pause_between = "days"
+    help = (
+        "Roll up completed tasks per day and user, from the last rolled up day "
+        "(or --from) through today."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=date.fromisoformat,
+            help="First day to roll up again (YYYY-MM-DD), e.g. after reopened tasks.",
+        )
+        parser.add_argument("--to", dest="end", type=date.fromisoformat)
+
+    def handle(self, *args, **options):
+        start = options["start"] or first_pending_day()
+        end = options["end"] or timezone.localdate()
+        if start is None:
+            self.stdout.write("No completed tasks to roll up")
+            return
+        if start > end:
+            raise CommandError("--from must not be after --to")
+        day, days = start, 0
+        while day <= end:
+            completed = rollup_day(day)
+            days += 1
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"{day}: {completed} completed")
+            day += timedelta(days=1)
+            if options["pause"] and day <= end:
+                time.sleep(options["pause"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rolled up {days} days, {start} to {end}")
+        )
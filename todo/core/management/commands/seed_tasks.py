@@ -0,0 +1,139 @@
+import random
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from core.models import Task
+
+WORDS = (
+    "buy call write fix plan review send clean book pay read update order "
+    "check prepare finish move renew cancel ask milk report invoice doctor "
+    "car garden kitchen meeting email project slides taxes tickets birthday "
+    "present dentist window bike backup server laptop groceries insurance"
+).split()
+# tasks per backdating UPDATE, two parameters each in the CASE and one in the
+# IN list stay below the SQLite variable limit
+BACKDATE_CHUNK_SIZE = 300
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with synthetic tasks for load tests and benchmarks. The same "
+        "--seed gives the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument(
+            "--tasks", type=int, default=200, help="Average number of tasks per user."
+        )
+        parser.add_argument("--prefix", default="bench_user_")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--complete-ratio",
+            type=float,
+            default=0.6,
+            help="Share of tasks that are already complete.",
+        )
+        parser.add_argument(
+            "--no-deadline-ratio",
+            type=float,
+            default=0.2,
+            help="Share of tasks without a planned completion.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def task_counts(self, rng: random.Random, users: int, average: int) -> list:
+        # a few heavy users and many light ones, like real task lists
+        return [max(1, int(rng.expovariate(1 / average))) for i in range(users)]
+
+    def make_task(
+        self, rng: random.Random, user: User, now, options
+    ) -> Tuple[Task, datetime]:
+        # the task and when it was created, up to a few weeks back
+        title = " ".join(rng.choice(WORDS) for i in range(rng.randint(2, 5)))
+        text = " ".join(rng.choice(WORDS) for i in range(rng.randint(5, 40)))
+        created = now - timedelta(hours=rng.expovariate(1 / (24 * 14)))
+        complete = rng.random() < options["complete_ratio"]
+        deadline = None
+        if rng.random() >= options["no_deadline_ratio"]:
+            # most deadlines are a few days after creation, some weeks
+            deadline = created + timedelta(hours=rng.expovariate(1 / 96))
+        completed = None
+        if complete:
+            hours = rng.expovariate(1 / 72)
+            completed = min(created + timedelta(hours=hours), now)
+        task = Task(
+            user=user,
+            title=title.capitalize(),
+            text=text.capitalize() + ".",
+            complete=complete,
+            date_planned_completion=deadline,
+            date_completion=completed,
+        )
+        return task, created
+
+    def insert(self, batch: List[Tuple[Task, datetime]]) -> int:
+        with transaction.atomic():
+            Task.objects.bulk_create([task for task, created in batch])
+            # date_created is auto_now_add, bulk_create sets it to now
+            for start in range(0, len(batch), BACKDATE_CHUNK_SIZE):
+                chunk = batch[start : start + BACKDATE_CHUNK_SIZE]
+                Task.objects.filter(
+                    pk__in=[task.pk for task, created in chunk]
+                ).update_flags(
+                    date_created=Case(
+                        *[
+                            When(pk=task.pk, then=Value(created))
+                            for task, created in chunk
+                        ],
+                        output_field=DateTimeField(),
+                    )
+                )
+        return len(batch)
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["tasks"] < 1:
+            raise CommandError("--users and --tasks must be positive")
+        rng = random.Random(options["seed"])
+        usernames = [f"{options['prefix']}{i}" for i in range(options["users"])]
+        existing = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        # one hash for everyone, hashing is slow on purpose
+        password = make_password(options["password"])
+        User.objects.bulk_create(
+            [
+                User(username=username, password=password)
+                for username in usernames
+                if username not in existing
+            ]
+        )
+        users = list(User.objects.filter(username__in=usernames).order_by("username"))
+        now = timezone.now()
+        created = 0
+        batch = []
+        for user, count in zip(
+            users, self.task_counts(rng, len(users), options["tasks"])
+        ):
+            for i in range(count):
+                batch.append(self.make_task(rng, user, now, options))
+                if len(batch) >= options["batch_size"]:
+                    created += self.insert(batch)
+                    batch = []
+        if batch:
+            created += self.insert(batch)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(usernames) - len(existing)} users and {created} tasks"
+            )
+        )
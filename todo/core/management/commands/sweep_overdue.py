@@ -0,0 +1,41 @@
+import time
+
+from django.utils import timezone
+
+from core.management.base import BatchCommand
+from core.models import Task
+
+
+class Command(BatchCommand):
+    help = (
+        "Flag tasks whose planned completion passed as overdue and update the "
+        "counters. Run it from cron or keep it running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping, sleep --interval seconds between the sweeps.",
+        )
+        parser.add_argument("--interval", type=float, default=60.0)
+
+    def sweep(self, options) -> int:
+        # one cutoff for the whole sweep, so it ends even while deadlines pass
+        now = timezone.now()
+        return self.run_batches(
+            lambda: Task.objects.sweep_overdue(now, options["batch_size"]),
+            options["pause"],
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flagged = self.sweep(options)
+            if flagged or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Flagged {flagged} tasks as overdue")
+                )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
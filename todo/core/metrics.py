@@ -0,0 +1,253 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, reraise
+from django.template.backends.django import Template as DjangoTemplate
+
+# In process request metrics, exposed in the Prometheus text format by
+# MetricsView (/metrics). Every worker process has its own numbers, Prometheus
+# scrapes each worker or sums them up.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ("view",)):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {value}"
+            for labels, value in values
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # per label values: count per bucket (the last one is +Inf), sum
+        self.values: Dict[tuple, Tuple[List[int], float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        with self.lock:
+            counts, total = self.values.get(labels, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[labels] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = sorted(
+                (labels, (list(c), s)) for labels, (c, s) in self.values.items()
+            )
+        lines = self.header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            names = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{names} {total}")
+            lines.append(f"{self.name}_count{names} {cumulative}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def register(metric: Metric) -> Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+REQUEST_SECONDS = register(
+    Histogram("todo_request_duration_seconds", "Request latency by URL name.")
+)
+REQUEST_QUERIES = register(
+    Histogram(
+        "todo_request_queries",
+        "SQL queries per request by URL name.",
+        buckets=QUERY_BUCKETS,
+    )
+)
+SQL_SECONDS = register(
+    Counter("todo_sql_seconds_total", "Time spent in SQL queries by URL name.")
+)
+TEMPLATE_SECONDS = register(
+    Counter(
+        "todo_template_render_seconds_total",
+        "Time spent rendering templates by URL name.",
+    )
+)
+RESPONSES = register(
+    Counter(
+        "todo_responses_total",
+        "Responses by URL name and status code.",
+        labels=("view", "status"),
+    )
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = False
+
+
+# stats of the request being served; context variables follow the ORM calls of
+# async views into the sync_to_async threads
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_stats", default=None
+)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - start
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    # connection_created handler, every new database connection is measured
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def view_name(request: HttpRequest) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or "unnamed"
+
+
+class MetricsMiddleware:
+    # first in MIDDLEWARE, so the session and user lookups are measured as well
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request: HttpRequest):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self.finish(request, response, stats, start)
+        return response
+
+    def start(self):
+        stats = RequestStats()
+        return stats, current_stats.set(stats), time.perf_counter()
+
+    def finish(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        stats: RequestStats,
+        start: float,
+    ) -> None:
+        name = view_name(request)
+        REQUEST_SECONDS.observe(name, value=time.perf_counter() - start)
+        REQUEST_QUERIES.observe(name, value=stats.queries)
+        SQL_SECONDS.inc(name, value=stats.sql_seconds)
+        TEMPLATE_SECONDS.inc(name, value=stats.template_seconds)
+        RESPONSES.inc(name, str(response.status_code))
+
+
+class TimedTemplate(DjangoTemplate):
+    # every render through the template backend counts: TemplateResponse,
+    # render(), render_to_string() in views and in the async views' threads
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None or stats.rendering:
+            # outside of a request, or nested in a render that is measured
+            return super().render(context, request)
+        stats.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.rendering = False
+            stats.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # settings.TEMPLATES backend, DjangoTemplates with measured renders
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_task_user"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["user", "complete", "date_planned_completion", "id"],
+                name="task_user_complete_plan_idx",
+            ),
+        ),
+    ]
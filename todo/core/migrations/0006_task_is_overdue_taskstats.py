@@ -0,0 +1,74 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def fill_task_stats(apps, schema_editor):
+    Task = apps.get_model("core", "Task")
+    TaskStats = apps.get_model("core", "TaskStats")
+    Task.objects.filter(
+        complete=False, date_planned_completion__lt=timezone.now()
+    ).update(is_overdue=True)
+    rows = (
+        Task.objects.exclude(user=None)
+        .order_by()
+        .values("user_id")
+        .annotate(
+            count_total=Count("id"),
+            count_complete=Count("id", filter=Q(complete=True)),
+            count_incomplete=Count("id", filter=Q(complete=False)),
+            count_overdue=Count("id", filter=Q(is_overdue=True)),
+        )
+    )
+    TaskStats.objects.bulk_create(
+        [
+            TaskStats(
+                user_id=row["user_id"],
+                total=row["count_total"],
+                complete=row["count_complete"],
+                incomplete=row["count_incomplete"],
+                overdue=row["count_overdue"],
+            )
+            for row in rows
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0005_task_user_complete_plan_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="task_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("complete", models.IntegerField(default=0)),
+                ("incomplete", models.IntegerField(default=0)),
+                ("overdue", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="is_overdue",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_task_stats, migrations.RunPython.noop),
+    ]
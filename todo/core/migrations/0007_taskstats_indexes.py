@@ -0,0 +1,47 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_task_is_overdue_taskstats"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="taskstats",
+            options={"verbose_name_plural": "task stats"},
+        ),
+        migrations.AddIndex(
+            model_name="taskstats",
+            index=models.Index(
+                fields=["overdue", "user"], name="taskstats_overdue_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskstats",
+            index=models.Index(
+                condition=models.Q(("overdue__gt", 0)),
+                fields=["total", "user"],
+                name="taskstats_total_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskstats",
+            index=models.Index(
+                condition=models.Q(("overdue__gt", 0)),
+                fields=["complete", "user"],
+                name="taskstats_complete_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskstats",
+            index=models.Index(
+                condition=models.Q(("overdue__gt", 0)),
+                fields=["incomplete", "user"],
+                name="taskstats_incomplete_idx",
+            ),
+        ),
+    ]
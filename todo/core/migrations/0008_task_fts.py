@@ -0,0 +1,63 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:30
+
+from django.db import migrations
+
+# FTS5 index of task title and text, see core/search.py. SQLite only.
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_task_fts USING fts5(
+        title, text, owner, tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO core_task_fts(rowid, title, text, owner)
+    SELECT id, title, text, 'u' || user_id FROM core_task
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_ai AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts(rowid, title, text, owner)
+        VALUES (new.id, new.title, new.text, 'u' || new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_ad AFTER DELETE ON core_task BEGIN
+        DELETE FROM core_task_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_task_fts_au
+    AFTER UPDATE OF title, text, user_id ON core_task BEGIN
+        UPDATE core_task_fts
+        SET title = new.title, text = new.text, owner = 'u' || new.user_id
+        WHERE rowid = old.id;
+    END
+    """,
+]
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_task_fts_ai",
+    "DROP TRIGGER IF EXISTS core_task_fts_ad",
+    "DROP TRIGGER IF EXISTS core_task_fts_au",
+    "DROP TABLE IF EXISTS core_task_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_taskstats_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_tasktombstone"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("complete", False), ("is_overdue", False)),
+                fields=["date_planned_completion"],
+                name="task_overdue_due_idx",
+            ),
+        ),
+    ]
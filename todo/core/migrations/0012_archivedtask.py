@@ -0,0 +1,78 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_date_completion(apps, schema_editor):
+    # completed before date_completion was kept, the last change is the best guess
+    Task = apps.get_model("core", "Task")
+    Task.objects.filter(complete=True, date_completion=None).update(
+        date_completion=models.F("updated_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0011_task_overdue_due_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_date_completion, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="ArchivedTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task_id", models.BigIntegerField(unique=True)),
+                ("title", models.CharField(max_length=255)),
+                ("text", models.TextField()),
+                ("date_created", models.DateTimeField()),
+                (
+                    "date_planned_completion",
+                    models.DateTimeField(blank=True, null=True),
+                ),
+                ("date_completion", models.DateTimeField()),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("complete", True)),
+                fields=["date_completion"],
+                name="task_completed_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtask",
+            index=models.Index(
+                fields=["user", "-date_completion", "-task_id"],
+                name="archived_user_completion_idx",
+            ),
+        ),
+    ]
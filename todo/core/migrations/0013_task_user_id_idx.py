@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_archivedtask"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["user", "id"], name="task_user_id_idx"),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0013_task_user_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyCompletionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("completed", models.PositiveIntegerField(default=0)),
+                ("with_deadline", models.PositiveIntegerField(default=0)),
+                ("on_time", models.PositiveIntegerField(default=0)),
+                ("median_hours", models.FloatField(blank=True, null=True)),
+                ("p90_hours", models.FloatField(blank=True, null=True)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedtask",
+            index=models.Index(
+                fields=["date_completion"], name="archived_completion_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailycompletionrollup",
+            name="user",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailycompletionrollup",
+            index=models.Index(fields=["user", "day"], name="rollup_user_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailycompletionrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user__isnull", False)),
+                fields=("day", "user"),
+                name="rollup_day_user_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailycompletionrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user__isnull", True)),
+                fields=("day",),
+                name="rollup_day_total_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_dailycompletionrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailycompletionrollup",
+            name="hours_histogram",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,8 +1,228 @@
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .cache import tasks_changed
+from .events import (
+    EVENT_TASK_LIMIT,
+    changed_tasks_event,
+    reload_event,
+    task_ids_event,
+    tasks_event,
+)
 
 # Create your models here.
 
+STAT_FIELDS = ("total", "complete", "incomplete", "overdue")
+# primary keys per IN list when following rows by primary key
+PK_CHUNK_SIZE = 500
+
+
+def is_overdue(
+    complete: bool, date_planned_completion: Optional[datetime], now: datetime
+) -> bool:
+    return (
+        not complete
+        and date_planned_completion is not None
+        and date_planned_completion < now
+    )
+
+
+def completion_date(
+    complete: bool, date_completion: Optional[datetime], now: datetime
+) -> Optional[datetime]:
+    # set when a task gets completed, cleared when it is opened again
+    if not complete:
+        return None
+    return date_completion or now
+
+
+def negated(delta: Counter) -> Counter:
+    return Counter({name: -value for name, value in delta.items()})
+
+
+def overdue_q(now: datetime) -> Q:
+    return Q(complete=False, date_planned_completion__lt=now)
+
+
+class TaskQuerySet(models.QuerySet):
+    # Bulk operations keep TaskStats in sync inside the same transaction.
+    # Saving one task is handled in Task.save and Task.delete.
+
+    def _contributions(self) -> Dict[int, Counter]:
+        # what the rows of this queryset add to the counters of their users
+        rows = (
+            self.order_by()
+            .values("user_id")
+            .annotate(
+                count_total=Count("id"),
+                count_complete=Count("id", filter=Q(complete=True)),
+                count_incomplete=Count("id", filter=Q(complete=False)),
+                count_overdue=Count("id", filter=Q(is_overdue=True)),
+            )
+        )
+        return {
+            row["user_id"]: Counter(
+                {name: row[f"count_{name}"] for name in STAT_FIELDS}
+            )
+            for row in rows
+        }
+
+    def refresh_overdue(self, now: Optional[datetime] = None) -> int:
+        # set is_overdue on rows where it does not match the deadline anymore
+        now = now or timezone.now()
+        changed = self.filter(overdue_q(now), is_overdue=False).update_flags(
+            is_overdue=True, updated_at=now
+        )
+        changed += (
+            self.filter(is_overdue=True)
+            .exclude(overdue_q(now))
+            .update_flags(is_overdue=False, updated_at=now)
+        )
+        return changed
+
+    def sweep_overdue(
+        self, now: Optional[datetime] = None, batch_size: int = 500
+    ) -> int:
+        # flag one batch of tasks whose deadline passed, oldest deadline first;
+        # the range scan runs on task_overdue_due_idx and stops at now
+        now = now or timezone.now()
+        due = self.filter(
+            complete=False, is_overdue=False, date_planned_completion__lt=now
+        )
+        with transaction.atomic(using=self.db):
+            batch = list(
+                due.order_by("date_planned_completion", "pk").values_list(
+                    "pk", "user_id"
+                )[:batch_size]
+            )
+            if not batch:
+                return 0
+            flagged = due.filter(pk__in=[pk for pk, _ in batch]).update_flags(
+                is_overdue=True, updated_at=now
+            )
+            per_user = Counter(user_id for _, user_id in batch if user_id is not None)
+            if flagged == len(batch):
+                TaskStats.apply_deltas(
+                    {user_id: Counter(overdue=n) for user_id, n in per_user.items()}
+                )
+            else:
+                # some rows changed since the select, count those users again
+                TaskStats.rebuild(per_user)
+            tasks_changed(per_user)
+            task_ids_event("overdue", batch)
+        return flagged
+
+    def update_flags(self, **kwargs) -> int:
+        # plain UPDATE without touching the counters, callers update them
+        return super().update(**kwargs)
+
+    def _contributions_of(self, pks: List[int]) -> Dict[int, Counter]:
+        # chunks keep the IN lists below the SQLite variable limit
+        totals: Dict[int, Counter] = defaultdict(Counter)
+        for start in range(0, len(pks), PK_CHUNK_SIZE):
+            chunk = self.model.objects.filter(pk__in=pks[start : start + PK_CHUNK_SIZE])
+            for user_id, counts in chunk._contributions().items():
+                totals[user_id].update(counts)
+        return totals
+
+    def update(self, **kwargs) -> int:
+        counted = {
+            "user",
+            "user_id",
+            "complete",
+            "date_planned_completion",
+            "is_overdue",
+        }
+        kwargs.setdefault("updated_at", timezone.now())
+        if "complete" in kwargs and "date_completion" not in kwargs:
+            kwargs["date_completion"] = (
+                Coalesce("date_completion", Value(kwargs["updated_at"]))
+                if kwargs["complete"]
+                else None
+            )
+        with transaction.atomic(using=self.db):
+            if counted & kwargs.keys():
+                # the counters change by what the updated rows contribute after
+                # the update minus before; the rows may not match the filter
+                # anymore afterwards, so they are followed by primary key
+                pks = list(self.order_by().values_list("pk", flat=True))
+                before = self._contributions()
+                rows = super().update(**kwargs)
+                for start in range(0, len(pks), PK_CHUNK_SIZE):
+                    self.model.objects.filter(
+                        pk__in=pks[start : start + PK_CHUNK_SIZE]
+                    ).refresh_overdue(kwargs["updated_at"])
+                deltas = self._contributions_of(pks)
+                for user_id, delta in before.items():
+                    deltas[user_id].subtract(delta)
+                TaskStats.apply_deltas(deltas)
+                user_ids = set(deltas)
+            else:
+                user_ids = set(
+                    self.order_by().values_list("user_id", flat=True).distinct()
+                )
+                # the rows for the live update event, not read when it is off
+                pks = (
+                    list(
+                        self.order_by().values_list("pk", flat=True)[
+                            : EVENT_TASK_LIMIT + 1
+                        ]
+                    )
+                    if settings.TASK_EVENTS
+                    else []
+                )
+                rows = super().update(**kwargs)
+                TaskStats.touch(user_ids - {None})
+            user_ids.discard(None)
+            tasks_changed(user_ids)
+            if settings.TASK_EVENTS:
+                if len(pks) > EVENT_TASK_LIMIT:
+                    reload_event(user_ids)
+                elif pks:
+                    changed_tasks_event(lambda: self.model.objects.filter(pk__in=pks))
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            deltas = self._contributions()
+            deleted = list(self.order_by().values_list("pk", "user_id"))
+            TaskTombstone.record(deleted)
+            result = super().delete()
+            TaskStats.apply_deltas(
+                {user_id: negated(delta) for user_id, delta in deltas.items()}
+            )
+            tasks_changed(deltas)
+            task_ids_event("deleted", deleted)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        now = timezone.now()
+        deltas: Dict[int, Counter] = defaultdict(Counter)
+        for obj in objs:
+            obj.is_overdue = is_overdue(obj.complete, obj.date_planned_completion, now)
+            obj.date_completion = completion_date(
+                obj.complete, obj.date_completion, now
+            )
+            deltas[obj.user_id].update(obj.stat_contribution())
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            TaskStats.apply_deltas(deltas)
+            tasks_changed(deltas)
+            tasks_event("created", created)
+        return created
+
 
 class Task(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -12,3 +232,331 @@ class Task(models.Model):
     complete = models.BooleanField(default=False)
     date_planned_completion = models.DateTimeField(blank=True, null=True)
     date_completion = models.DateTimeField(blank=True, null=True)
+    # denormalized "incomplete and deadline passed" state, counted in TaskStats
+    is_overdue = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # matches the ordering of the task list so one user's page is a
+            # plain index range scan (see TaskListView)
+            models.Index(
+                fields=["user", "complete", "date_planned_completion", "id"],
+                name="task_user_complete_plan_idx",
+            ),
+            models.Index(fields=["user", "updated_at"], name="task_user_updated_idx"),
+            # one task of its owner, see OwnedTaskMixin
+            models.Index(fields=["user", "id"], name="task_user_id_idx"),
+            # completed tasks by age, see ArchivedTask.archive
+            models.Index(
+                fields=["date_completion"],
+                name="task_completed_idx",
+                condition=Q(complete=True),
+            ),
+            # only tasks that can still become overdue, see sweep_overdue
+            models.Index(
+                fields=["date_planned_completion"],
+                name="task_overdue_due_idx",
+                condition=Q(complete=False, is_overdue=False),
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counted = instance._counted_state()
+        return instance
+
+    def _counted_state(self) -> Optional[tuple]:
+        if not {"user_id", "complete", "is_overdue"} <= self.__dict__.keys():
+            return None
+        return (self.user_id, self.complete, self.is_overdue)
+
+    def stat_contribution(self, state: Optional[tuple] = None) -> Counter:
+        user_id, complete, overdue = state or (
+            self.user_id,
+            self.complete,
+            self.is_overdue,
+        )
+        return Counter(
+            total=1,
+            complete=int(complete),
+            incomplete=int(not complete),
+            overdue=int(overdue),
+        )
+
+    # save and delete change the per user counters in the same transaction
+    def save(self, *args, **kwargs):
+        now = timezone.now()
+        self.is_overdue = is_overdue(self.complete, self.date_planned_completion, now)
+        self.date_completion = completion_date(self.complete, self.date_completion, now)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {
+                "is_overdue",
+                "date_completion",
+                "updated_at",
+            }
+        old = None
+        adding = self._state.adding
+        if not adding:
+            old = getattr(self, "_counted", None)
+            if old is None:
+                old = (
+                    type(self)
+                    .objects.filter(pk=self.pk)
+                    .values_list("user_id", "complete", "is_overdue")
+                    .first()
+                )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            deltas: Dict[int, Counter] = defaultdict(Counter)
+            if old is not None:
+                deltas[old[0]].subtract(self.stat_contribution(old))
+            deltas[self.user_id].update(self.stat_contribution())
+            TaskStats.apply_deltas(deltas)
+            tasks_changed(deltas)
+            tasks_event("created" if adding else "updated", [self])
+            if old is not None and old[0] != self.user_id:
+                task_ids_event("deleted", [(self.pk, old[0])])
+        self._counted = self._counted_state()
+
+    def delete(self, *args, **kwargs):
+        state = getattr(self, "_counted", None) or self._counted_state()
+        pk = self.pk
+        with transaction.atomic():
+            TaskTombstone.record([(self.pk, state[0])])
+            result = super().delete(*args, **kwargs)
+            TaskStats.apply_deltas({state[0]: negated(self.stat_contribution(state))})
+            tasks_changed([state[0]])
+            task_ids_event("deleted", [(pk, state[0])])
+        self._counted = None
+        return result
+
+
+class TaskStats(models.Model):
+    # Per user task counters, one row lookup instead of COUNT(*) over the tasks.
+    # Kept up to date by Task and TaskQuerySet, rebuild_task_stats repairs drift.
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="task_stats"
+    )
+    total = models.IntegerField(default=0)
+    complete = models.IntegerField(default=0)
+    incomplete = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    # last change of any task of the user, deletes included (Last-Modified of the list)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "task stats"
+        # sortable columns of the staff user list (AdminUserList), which only
+        # shows users with overdue tasks, hence the partial indexes
+        indexes = [
+            models.Index(fields=["overdue", "user"], name="taskstats_overdue_idx"),
+            models.Index(
+                fields=["total", "user"],
+                name="taskstats_total_idx",
+                condition=Q(overdue__gt=0),
+            ),
+            models.Index(
+                fields=["complete", "user"],
+                name="taskstats_complete_idx",
+                condition=Q(overdue__gt=0),
+            ),
+            models.Index(
+                fields=["incomplete", "user"],
+                name="taskstats_incomplete_idx",
+                condition=Q(overdue__gt=0),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.total} tasks"
+
+    @classmethod
+    def for_user(cls, user: User) -> "TaskStats":
+        stats = cls.objects.filter(user=user).first()
+        if stats is None:
+            cls.rebuild([user.pk])
+            # the new row is not on a replica yet
+            stats = cls.objects.using(router.db_for_write(cls)).get(user=user)
+        return stats
+
+    @classmethod
+    def apply_deltas(cls, deltas: Dict[Optional[int], Counter]) -> None:
+        now = timezone.now()
+        for user_id, delta in deltas.items():
+            if user_id is None:
+                continue
+            updated = cls.objects.filter(user_id=user_id).update(
+                updated_at=now, **{name: F(name) + delta[name] for name in STAT_FIELDS}
+            )
+            if not updated:
+                # first task of the user (or the row was lost), count from scratch
+                cls.rebuild([user_id])
+
+    @classmethod
+    def touch(cls, user_ids: Iterable[int]) -> None:
+        cls.objects.filter(user_id__in=list(user_ids)).update(updated_at=timezone.now())
+
+    @classmethod
+    def compute(cls, user_ids: Iterable[int]) -> Dict[int, Counter]:
+        user_ids = list(user_ids)
+        counts = {
+            user_id: Counter({name: 0 for name in STAT_FIELDS}) for user_id in user_ids
+        }
+        counts.update(Task.objects.filter(user_id__in=user_ids)._contributions())
+        return counts
+
+    @classmethod
+    def rebuild(cls, user_ids: Iterable[int]) -> Dict[int, Counter]:
+        counts = cls.compute(user_ids)
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, updated_at=now, **delta)
+                for user_id, delta in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=[*STAT_FIELDS, "updated_at"],
+        )
+        return counts
+
+
+class TaskTombstone(models.Model):
+    # Deleted tasks, so delta sync clients learn about deletes (see core/sync.py).
+    # compact_tombstones removes the old ones in batches.
+    task_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"
+            ),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"task {self.task_id} deleted {self.deleted_at}"
+
+    @classmethod
+    def record(cls, tasks: Iterable[tuple], batch_size: int = 500) -> None:
+        # tasks are (task id, user id) pairs, tasks without a user are not synced
+        now = timezone.now()
+        batch = []
+        for task_id, user_id in tasks:
+            if user_id is None:
+                continue
+            batch.append(cls(task_id=task_id, user_id=user_id, deleted_at=now))
+            if len(batch) >= batch_size:
+                cls.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            cls.objects.bulk_create(batch)
+
+
+class ArchivedTask(models.Model):
+    # Tasks completed long ago, moved out of core_task by archive_tasks so the
+    # task list, the counters and the search only see the live tasks.
+    task_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    title = models.CharField(max_length=255)
+    text = models.TextField()
+    date_created = models.DateTimeField()
+    date_planned_completion = models.DateTimeField(blank=True, null=True)
+    date_completion = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # ordering of ArchivedTaskListView, newest completion first
+            models.Index(
+                fields=["user", "-date_completion", "-task_id"],
+                name="archived_user_completion_idx",
+            ),
+            # one day of completions for rollup_completions
+            models.Index(fields=["date_completion"], name="archived_completion_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return self.title
+
+    @classmethod
+    def archive(cls, cutoff: datetime, batch_size: int = 500) -> int:
+        # move one batch of tasks completed before cutoff, one short transaction
+        tasks = Task.objects.filter(complete=True, date_completion__lt=cutoff)
+        with transaction.atomic():
+            batch = list(
+                tasks.select_for_update().order_by("date_completion", "pk")[:batch_size]
+            )
+            if not batch:
+                return 0
+            now = timezone.now()
+            cls.objects.bulk_create(
+                [
+                    cls(
+                        task_id=task.pk,
+                        user_id=task.user_id,
+                        title=task.title,
+                        text=task.text,
+                        date_created=task.date_created,
+                        date_planned_completion=task.date_planned_completion,
+                        date_completion=task.date_completion,
+                        archived_at=now,
+                    )
+                    for task in batch
+                ]
+            )
+            # counters, tombstones for sync clients and cache versions as usual
+            Task.objects.filter(pk__in=[task.pk for task in batch]).delete()
+        return len(batch)
+
+
+class DailyCompletionRollup(models.Model):
+    # Completed tasks of one day (TIME_ZONE) per user, and with user NULL for
+    # all users together, live and archived tasks alike. Filled by
+    # rollup_completions (core/analytics.py); CompletionStatsView only reads
+    # these rows, never the tasks.
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    completed = models.PositiveIntegerField(default=0)
+    # completed tasks that had a planned completion, and those done by then
+    with_deadline = models.PositiveIntegerField(default=0)
+    on_time = models.PositiveIntegerField(default=0)
+    # hours from creation to completion, None for a day without completions
+    median_hours = models.FloatField(null=True, blank=True)
+    p90_hours = models.FloatField(null=True, blank=True)
+    # {bucket: tasks} of the same hours, see core/analytics.py; merged over
+    # days for the percentiles of a longer period
+    hours_histogram = models.JSONField(default=dict, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user"],
+                name="rollup_day_user_uniq",
+                condition=Q(user__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=["day"],
+                name="rollup_day_total_uniq",
+                condition=Q(user__isnull=True),
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "day"], name="rollup_user_day_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.user_id or 'all'}: {self.completed}"
+
+    @property
+    def on_time_ratio(self) -> Optional[float]:
+        if not self.with_deadline:
+            return None
+        return self.on_time / self.with_deadline
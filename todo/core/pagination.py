@@ -0,0 +1,148 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple, Type
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+
+# Keyset (cursor) pagination. Instead of OFFSET the next page starts right after
+# the last row of the previous one, so the database walks the index from that
+# point and every page costs the same no matter how deep the user pages.
+# Ordering fields use the normal "field" / "-field" notation and the last one
+# must be unique (usually "pk") so that every row has a stable position.
+
+
+def _field_for(model: Type[Model], path: str):
+    # follow "user__username" style paths so related fields can be used too
+    field = None
+    for part in path.split("__"):
+        field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+        if field.is_relation and field.related_model is not None:
+            model = field.related_model
+    return field
+
+
+def _value_for(obj: Any, path: str) -> Any:
+    for part in path.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _json_default(value: Any) -> str:
+    # full isoformat on purpose, DjangoJSONEncoder drops the microseconds and
+    # the cursor has to compare equal to the stored value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_values(cursor: str, length: int) -> List[Any]:
+    # the raw JSON values of a cursor, Http404 when it was not made by encode_cursor
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise Http404("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise Http404("Invalid cursor")
+    return values
+
+
+def decode_cursor(
+    model: Type[Model], ordering: Sequence[str], cursor: str
+) -> List[Any]:
+    values = decode_values(cursor, len(ordering))
+    try:
+        return [
+            (
+                None
+                if value is None
+                else _field_for(model, name.lstrip("-")).to_python(value)
+            )
+            for name, value in zip(ordering, values)
+        ]
+    except (ValidationError, TypeError, ValueError):
+        # well formed JSON with values of the wrong type, e.g. a number for a date
+        raise Http404("Invalid cursor")
+
+
+def _after(name: str, value: Any, nullable: bool) -> Q:
+    # rows that come strictly after "value" in the ordering of one column.
+    # SQLite sorts NULL first in ascending and last in descending order.
+    field = name.lstrip("-")
+    if name.startswith("-"):
+        if value is None:
+            return Q(pk__in=[])
+        if not nullable:
+            return Q(**{f"{field}__lt": value})
+        return Q(**{f"{field}__lt": value}) | Q(**{f"{field}__isnull": True})
+    if value is None:
+        return Q(**{f"{field}__isnull": False})
+    return Q(**{f"{field}__gt": value})
+
+
+def _equal(name: str, value: Any) -> Q:
+    field = name.lstrip("-")
+    if value is None:
+        return Q(**{f"{field}__isnull": True})
+    return Q(**{field: value})
+
+
+def keyset_filter(
+    model: Type[Model], ordering: Sequence[str], values: Sequence[Any]
+) -> Q:
+    # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for name, value in zip(ordering, values):
+        nullable = _field_for(model, name.lstrip("-")).null
+        condition |= prefix & _after(name, value, nullable)
+        prefix &= _equal(name, value)
+    return condition
+
+
+def keyset_queryset(
+    queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], page_size: int
+) -> QuerySet:
+    # one page and one extra row, the extra row tells if there is a next page
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(queryset.model, ordering, cursor)
+        queryset = queryset.filter(keyset_filter(queryset.model, ordering, values))
+    return queryset[: page_size + 1]
+
+
+def keyset_page(
+    rows: List[Model], ordering: Sequence[str], page_size: int
+) -> Tuple[List[Model], Optional[str]]:
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(
+        [_value_for(last, name.lstrip("-")) for name in ordering]
+    )
+
+
+def paginate_keyset(
+    queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], page_size: int
+) -> Tuple[List[Model], Optional[str]]:
+    # Returns the rows of one page and the cursor of the next page (None on the last page)
+    rows = list(keyset_queryset(queryset, ordering, cursor, page_size))
+    return keyset_page(rows, ordering, page_size)
+
+
+async def apaginate_keyset(
+    queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], page_size: int
+) -> Tuple[List[Model], Optional[str]]:
+    # paginate_keyset for async views, the rows are read with async iteration
+    rows = [row async for row in keyset_queryset(queryset, ordering, cursor, page_size)]
+    return keyset_page(rows, ordering, page_size)
@@ -0,0 +1,49 @@
+import time
+from typing import Callable, Dict, Optional
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+
+from .cache import bump_task_versions
+from .models import ArchivedTask, Task, TaskTombstone
+
+# Deleting a user lets the collector load every related task into memory and
+# delete them in one long transaction. purge_user deletes the rows of the big
+# tables first, in short transactions of batch_size rows with plain DELETEs,
+# then the user with what little is left (TaskStats, sessions, admin log).
+
+PURGE_BATCH_SIZE = 1000
+# the big per user tables; nothing references their rows, so no collector needed
+PURGED_MODELS = (Task, TaskTombstone, ArchivedTask)
+
+Progress = Callable[[User, str, int], None]
+
+
+def purge_user(
+    user: User,
+    batch_size: int = PURGE_BATCH_SIZE,
+    pause: float = 0.0,
+    progress: Optional[Progress] = None,
+) -> Dict[str, int]:
+    # returns the deleted rows per model label, progress(user, label, total so
+    # far) is called after every batch
+    deleted: Dict[str, int] = {}
+    for model in PURGED_MODELS:
+        label = model._meta.label
+        deleted[label] = 0
+        rows = model.objects.filter(user_id=user.pk)
+        while True:
+            using = router.db_for_write(model)
+            with transaction.atomic(using=using):
+                pks = list(rows.using(using).values_list("pk", flat=True)[:batch_size])
+                if not pks:
+                    break
+                # no counters, tombstones or events, the user is going away
+                deleted[label] += model.objects.filter(pk__in=pks)._raw_delete(using)
+            if progress is not None:
+                progress(user, label, deleted[label])
+            if pause:
+                time.sleep(pause)
+    user.delete()
+    bump_task_versions([user.pk])
+    return deleted
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+# Primary/replica routing. Writes always go to "default". Reads go to the
+# replica (settings.REPLICA_DATABASE) only inside read_from_replica(), which
+# the read only views use (ReplicaReadMixin); everything else reads the primary.
+# After a write the browser gets a short lived signed cookie and reads the
+# primary until it expires, whichever worker serves the next request.
+
+replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def read_from_replica() -> Iterator[None]:
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        if settings.REPLICA_DATABASE and replica_reads.get():
+            return settings.REPLICA_DATABASE
+        return "default"
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # the replica holds the same rows, objects from both may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        # the replica gets the schema from the primary
+        return db == "default"
+
+
+PIN_COOKIE = "todo_primary"
+PIN_SALT = "core.routers.pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+def pinned_to_primary(request: HttpRequest) -> bool:
+    # read your writes, the replica may not have the new rows yet
+    return (
+        request.get_signed_cookie(
+            PIN_COOKIE,
+            default=None,
+            salt=PIN_SALT,
+            max_age=settings.REPLICA_PIN_SECONDS,
+        )
+        is not None
+    )
+
+
+class ReplicaPinMiddleware:
+    # any successful unsafe request may have written, its client reads the
+    # primary for REPLICA_PIN_SECONDS
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if (
+            settings.REPLICA_DATABASE
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.set_signed_cookie(
+                PIN_COOKIE,
+                "1",
+                salt=PIN_SALT,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,114 @@
+import re
+from typing import List
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Task
+
+# Full text search over Task.title and Task.text. On SQLite an FTS5 table
+# mirrors core_task (rowid = task id) and is kept in sync by triggers. The owner
+# is indexed as a token too, so a search only walks the documents of one user.
+# Django rebuilds the table on some schema changes and drops the triggers with
+# it, CoreConfig.ready installs them again after every migrate.
+
+FTS_TABLE = "core_task_fts"
+SEARCH_LIMIT = 20
+# control characters around the matched words, replaced by <mark> after escaping
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+CREATE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, text, owner, tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+FILL_SQL = f"""
+    INSERT INTO {FTS_TABLE}(rowid, title, text, owner)
+    SELECT id, title, text, 'u' || user_id FROM core_task
+"""
+TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON core_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text, owner)
+        VALUES (new.id, new.title, new.text, 'u' || new.user_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON core_task BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, text, user_id ON core_task BEGIN
+        UPDATE {FTS_TABLE}
+        SET title = new.title, text = new.text, owner = 'u' || new.user_id
+        WHERE rowid = old.id;
+    END
+    """,
+]
+SEARCH_SQL = f"""
+    SELECT core_task.*,
+        highlight({FTS_TABLE}, 0, %s, %s) AS title_highlight,
+        snippet({FTS_TABLE}, 1, %s, %s, '...', 12) AS snippet,
+        bm25({FTS_TABLE}, 10.0, 1.0, 0.0) AS rank
+    FROM {FTS_TABLE}
+    JOIN core_task ON core_task.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s AND core_task.user_id = %s
+    ORDER BY rank
+    LIMIT %s
+"""
+
+
+def fts_available(using: str = "default") -> bool:
+    return connections[using].vendor == "sqlite"
+
+
+def install_triggers(using: str = "default") -> None:
+    connection = connections[using]
+    if not fts_available(using):
+        return
+    if FTS_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for sql in TRIGGER_SQL:
+            cursor.execute(sql)
+
+
+def fts_query(text: str, user: User) -> str:
+    # every word is quoted (no FTS syntax from users) and used as a prefix
+    words = re.findall(r"\w+", text)[:10]
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f'owner : "u{user.pk}" AND {{title text}} : ({terms})'
+
+
+def _highlight(snippet: str) -> str:
+    return mark_safe(
+        escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+    )
+
+
+def search_tasks(user: User, text: str, limit: int = SEARCH_LIMIT) -> List[Task]:
+    # best matches first, every task gets a highlighted .snippet
+    if not re.search(r"\w", text):
+        return []
+    if not fts_available():
+        tasks = list(
+            Task.objects.filter(user=user, title__icontains=text.strip())[:limit]
+        )
+        for task in tasks:
+            task.title_highlight = escape(task.title)
+            task.snippet = escape(task.text[:100])
+        return tasks
+    tasks = list(
+        Task.objects.raw(
+            SEARCH_SQL,
+            [MATCH_START, MATCH_END] * 2 + [fts_query(text, user), user.pk, limit],
+        )
+    )
+    for task in tasks:
+        task.title_highlight = _highlight(task.title_highlight)
+        task.snippet = _highlight(task.snippet)
+    return tasks
@@ -0,0 +1,105 @@
+import asyncio
+from importlib import import_module
+from typing import Any, Callable, Dict, Union
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+from django.http import HttpRequest, parse_cookie
+
+from .events import encode_event, get_backend
+
+# Server-Sent Events stream of the task changes of the logged in user. Django
+# 4.1 cannot stream an async response, so this is a plain ASGI application that
+# todo/asgi.py mounts next to Django on EVENTS_PATH. Under WSGI (runserver) the
+# path does not exist and the task list simply stays without live updates.
+
+EVENTS_PATH = "/events"
+
+Scope = Dict[str, Any]
+
+
+async def scope_user(scope: Scope) -> Union[AbstractBaseUser, AnonymousUser]:
+    # the session cookie is read like SessionMiddleware and AuthenticationMiddleware do
+    headers = dict(scope.get("headers", []))
+    cookies = parse_cookie(headers.get(b"cookie", b"").decode("latin-1"))
+    session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return AnonymousUser()
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    return await sync_to_async(get_user)(request)
+
+
+async def plain_response(send: Callable, status: int, body: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def wait_for_disconnect(receive: Callable) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def task_events_app(scope: Scope, receive: Callable, send: Callable) -> None:
+    if scope["method"] != "GET":
+        await plain_response(send, 405, b"Method not allowed")
+        return
+    user = await scope_user(scope)
+    if not user.is_authenticated:
+        await plain_response(send, 403, b"Login required")
+        return
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                # no buffering in nginx, events must go out right away
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    await send(
+        {"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True}
+    )
+    events = get_backend().subscribe(user.pk)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_event = None
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(events.__anext__())
+            done, pending = await asyncio.wait(
+                {next_event, disconnect},
+                timeout=settings.TASK_EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                break
+            if next_event in done:
+                body = f"data: {encode_event(next_event.result())}\n\n".encode()
+                next_event = None
+            else:
+                # comment line, keeps proxies from closing an idle stream
+                body = b": keep-alive\n\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+    finally:
+        disconnect.cancel()
+        if next_event is not None:
+            next_event.cancel()
+            try:
+                await next_event
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        await events.aclose()
@@ -0,0 +1,74 @@
+// Live updates of the task list from the Server-Sent Events stream (/events).
+// Rows are patched in place, the page is only reloaded for large changes.
+$(function () {
+    var rows = document.getElementById("task-rows");
+    if (!rows || !window.EventSource) {
+        return;
+    }
+    var template = document.getElementById("task-row-template");
+
+    function taskUrl(name, id) {
+        return rows.dataset[name].replace(/0$/, id);
+    }
+
+    function findRow(id) {
+        return rows.querySelector('[data-task-id="' + id + '"]');
+    }
+
+    function showDeadline(cell, task) {
+        $(cell).empty();
+        if (task.is_overdue) {
+            $(cell).append('<span class="badge bg-danger">Overdue</span>');
+        } else if (task.date_planned_completion) {
+            $(cell).text(new Date(task.date_planned_completion).toLocaleString());
+        }
+    }
+
+    function newRow(task) {
+        var row = template.content.firstElementChild.cloneNode(true);
+        row.dataset.taskId = task.id;
+        row.querySelector("input").value = task.id;
+        row.querySelector(".task-link").href = taskUrl("detailUrl", task.id);
+        row.querySelector(".task-delete").href = taskUrl("deleteUrl", task.id);
+        rows.prepend(row);
+        return row;
+    }
+
+    function showTask(row, task) {
+        var link = row.querySelector(".task-link");
+        link.className = (task.complete ? "links-complete" : "links") + " task-link";
+        row.querySelector(".task-title").textContent = task.title;
+        showDeadline(row.querySelector(".task-deadline"), task);
+    }
+
+    var source = new EventSource(rows.dataset.eventsUrl);
+    source.onmessage = function (message) {
+        var event = JSON.parse(message.data);
+        if (event.type === "reload") {
+            window.location.reload();
+            return;
+        }
+        (event.tasks || []).forEach(function (task) {
+            var row = findRow(task.id);
+            if (!row) {
+                // new tasks show up on the first page, other tasks are not on this one
+                if (event.type !== "created" || rows.dataset.firstPage !== "1") {
+                    return;
+                }
+                row = newRow(task);
+            }
+            showTask(row, task);
+        });
+        (event.ids || []).forEach(function (id) {
+            var row = findRow(id);
+            if (!row) {
+                return;
+            }
+            if (event.type === "deleted") {
+                row.remove();
+            } else if (event.type === "overdue") {
+                showDeadline(row.querySelector(".task-deadline"), {is_overdue: true});
+            }
+        });
+    };
+});
@@ -0,0 +1,144 @@
+import gzip
+import mimetypes
+import os
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpRequest, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip variants without it
+    brotli = None
+
+# Production static files (settings.STATIC_PRODUCTION). collectstatic writes
+# content hashed names plus .br and .gz variants next to them, the middleware
+# serves them from STATIC_ROOT with the best encoding the browser accepts. The
+# hashed names never change content, so browsers keep them for a year.
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".map", ".txt", ".html"}
+MIN_COMPRESS_SIZE = 200
+# Manifest storage adds 12 hex digits of the md5 before the extension
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# names without a hash (admin files referenced directly) are revalidated hourly
+SHORT_CACHE = "public, max-age=3600"
+# Accept-Encoding token, file suffix, in order of preference
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def compress(path: str) -> List[str]:
+    # writes the variants that are smaller than the file, returns their paths
+    with open(path, "rb") as source:
+        content = source.read()
+    if len(content) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content)))
+    written = []
+    for suffix, data in variants:
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as output:
+                output.write(data)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run: bool = False, **options) -> Iterator:
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            yield name, hashed_name, processed
+            if dry_run or not isinstance(hashed_name, str):
+                continue
+            processed_names.add(hashed_name)
+        if dry_run:
+            return
+        for hashed_name in sorted(processed_names):
+            if os.path.splitext(hashed_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                compress(self.path(hashed_name))
+
+
+def accepted_encodings(request: HttpRequest) -> List[str]:
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return [coding for coding, suffix in ENCODINGS if coding in accepted]
+
+
+class StaticFilesMiddleware:
+    # in front of the session and auth middleware, a static file costs one stat()
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable):
+        if not settings.STATIC_PRODUCTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = str(settings.STATIC_ROOT)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.static_response(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest):
+        # stat() and open() of a local file, not worth a trip to the thread pool
+        response = self.static_response(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    def static_response(self, request: HttpRequest) -> Optional[HttpResponse]:
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            return self.serve(request, request.path[len(self.prefix) :])
+        return None
+
+    def find(self, name: str) -> Optional[str]:
+        try:
+            path = safe_join(self.root, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def serve(self, request: HttpRequest, name: str) -> Optional[HttpResponse]:
+        path = self.find(name)
+        if path is None:
+            return None
+        encoding = None
+        accepted = accepted_encodings(request)
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                encoding, path = coding, path + suffix
+                break
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        stat = os.stat(path)
+        # the server drops the body of a HEAD response, the headers stay
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = str(stat.st_size)
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Cache-Control"] = (
+            IMMUTABLE if HASHED_NAME.search(name) else SHORT_CACHE
+        )
+        response["Vary"] = "Accept-Encoding"
+        if encoding:
+            response["Content-Encoding"] = encoding
+        return response
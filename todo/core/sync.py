@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, TaskTombstone
+from .pagination import decode_values, encode_cursor
+
+# Delta sync. Changed tasks (by updated_at) and tombstones (by deleted_at) are
+# merged into one stream ordered by (time, kind, id); the cursor is the position
+# of the last item the client got, so it can stop and continue at any point.
+# The cursor also carries the server time of the last sync that reached the end
+# of the stream: the client has every tombstone up to then, so only that time
+# decides whether compacted tombstones could be missing, not the position (the
+# last change of a quiet account can be months old).
+# updated_at and deleted_at are taken before the commit, so a row can show up
+# with a time before a sync that did not see it yet. A sync that reaches the end
+# leaves its cursor SYNC_OVERLAP_SECONDS before the server time, the next sync
+# sends those rows again; clients apply changes by id and updated_at, so a
+# repeated change or delete is a no-op.
+
+TASK, TOMBSTONE = 0, 1
+SYNC_PAGE_SIZE = 500
+
+
+def _parse_moment(value: Any) -> datetime:
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None or timezone.is_naive(moment):
+        raise Http404("Invalid cursor")
+    return moment
+
+
+def _decode(cursor: str) -> Tuple[datetime, int, int, Optional[datetime]]:
+    try:
+        moment, kind, last_id, synced_at = decode_values(cursor, 4)
+    except Http404:
+        # cursors from before the sync time was added
+        moment, kind, last_id = decode_values(cursor, 3)
+        synced_at = None
+    if kind not in (TASK, TOMBSTONE) or not isinstance(last_id, int):
+        raise Http404("Invalid cursor")
+    if synced_at is not None:
+        synced_at = _parse_moment(synced_at)
+    return _parse_moment(moment), kind, last_id, synced_at
+
+
+def _after(
+    field: str, kind: int, moment: datetime, cursor_kind: int, last_id: int
+) -> Q:
+    # rows of one kind that come after the cursor (moment, cursor_kind, last_id)
+    if cursor_kind < kind:
+        return Q(**{f"{field}__gte": moment})
+    if cursor_kind > kind:
+        return Q(**{f"{field}__gt": moment})
+    return Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "pk__gt": last_id})
+
+
+def changes_since(
+    user: User, cursor: Optional[str], limit: int = SYNC_PAGE_SIZE
+) -> Dict[str, Any]:
+    # taken before the reads, rows committed while they run come again next time
+    now = timezone.now()
+    tasks = Task.objects.filter(user=user)
+    tombstones = TaskTombstone.objects.filter(user=user)
+    position, synced_at = None, None
+    if cursor:
+        moment, kind, last_id, synced_at = _decode(cursor)
+        position = (moment, kind, last_id)
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if max(moment, synced_at or moment) < now - retention:
+            # tombstones older than the cursor may be compacted already
+            return {
+                "reset": True,
+                "changed": [],
+                "deleted": [],
+                "cursor": None,
+                "has_more": False,
+            }
+        tasks = tasks.filter(_after("updated_at", TASK, moment, kind, last_id))
+        tombstones = tombstones.filter(
+            _after("deleted_at", TOMBSTONE, moment, kind, last_id)
+        )
+    else:
+        # first sync, the client has nothing that could have been deleted
+        tombstones = tombstones.none()
+    items: List[Tuple[datetime, int, int, Any]] = [
+        (task.updated_at, TASK, task.pk, task)
+        for task in tasks.order_by("updated_at", "pk")[: limit + 1]
+    ]
+    items += [
+        (tombstone.deleted_at, TOMBSTONE, tombstone.pk, tombstone)
+        for tombstone in tombstones.order_by("deleted_at", "pk")[: limit + 1]
+    ]
+    items.sort(key=lambda item: item[:3])
+    has_more = len(items) > limit
+    items = items[:limit]
+    if items:
+        position = items[-1][:3]
+    if not has_more:
+        synced_at = now
+        overlap = now - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        if position and position > (overlap, TASK, 0):
+            position = (overlap, TASK, 0)
+    cursor = encode_cursor([*position, synced_at]) if position else None
+    return {
+        "reset": False,
+        "changed": [item[3] for item in items if item[1] == TASK],
+        "deleted": [item[3].task_id for item in items if item[1] == TOMBSTONE],
+        "cursor": cursor,
+        "has_more": has_more,
+    }
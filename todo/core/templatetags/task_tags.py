@@ -0,0 +1,72 @@
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+from django import template
+from django.urls import get_script_prefix, reverse
+from django.utils import timezone
+from django.utils.html import conditional_escape
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.timesince import timeuntil
+
+from core.models import Task
+
+# Fast rendering of the task list rows. The markup is the same as in
+# task_rows_reference.html, but built by string formatting with the task URLs
+# reversed once per process, instead of a template loop that runs {% url %},
+# timeuntil and the branches for every row.
+
+register = template.Library()
+
+ROW_HTML = (
+    '<div class="row task-body d-flex align-items-center px-5" data-task-id="{pk}">'
+    '<div class="col-1"><input type="checkbox" name="tasks" value="{pk}" '
+    'form="bulk-form" class="form-check-input"></div>'
+    '<div class="col-4"><a class="{link_class} task-link" href="{detail}{pk}">'
+    '<h1 class="task-title text-start">{title}</h1></a></div>'
+    '<div class="col-5 text-end task-deadline">{deadline}</div>'
+    '<div class="col-2"><a class="links task-delete" href="{delete}{pk}">'
+    '<h1 class="">x</h1></a></div>'
+    "<hr></div>\n"
+)
+OVERDUE_HTML = '<span class="badge bg-danger">Overdue</span>'
+
+
+@lru_cache(maxsize=None)
+def _url_prefixes(script_prefix: str) -> Tuple[str, str]:
+    # "/detail_task/0" -> "/detail_task/", the pk is appended per row
+    return tuple(
+        reverse(name, args=[0])[:-1] for name in ("detail_task", "delete_task")
+    )
+
+
+def url_prefixes() -> Tuple[str, str]:
+    return _url_prefixes(get_script_prefix())
+
+
+def render_task_rows(tasks: Iterable[Task]) -> SafeString:
+    detail, delete = url_prefixes()
+    now = timezone.now()
+    rows = []
+    for task in tasks:
+        if task.is_overdue:
+            deadline = OVERDUE_HTML
+        elif task.date_planned_completion:
+            deadline = timeuntil(task.date_planned_completion, now)
+        else:
+            deadline = ""
+        rows.append(
+            ROW_HTML.format(
+                pk=int(task.pk),
+                link_class="links-complete" if task.complete else "links",
+                detail=detail,
+                delete=delete,
+                title=conditional_escape(task.title),
+                deadline=deadline,
+            )
+        )
+    return mark_safe("".join(rows))
+
+
+@register.simple_tag
+def task_rows(tasks: Iterable[Task]) -> SafeString:
+    return render_task_rows(tasks)
@@ -1,15 +1,66 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse, resolve, reverse_lazy, path
+from django.utils import timezone
+from datetime import timedelta
+from unittest.mock import patch
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.core.cache import cache
+from django.contrib.sessions.models import Session
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+import csv
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from .importer import IMPORT_MAX_ERRORS, import_tasks
+from .pagination import encode_cursor
+from .search import search_tasks
+from .sync import changes_since
+from .metrics import (
+    REQUEST_QUERIES,
+    TEMPLATE_SECONDS,
+    RequestStats,
+    current_stats,
+    render_metrics,
+)
+from .benchmark import percentile
+from .routers import PIN_COOKIE, ReplicaRouter, read_from_replica
+from .writes import WRITE_BATCH_SIZE, WriteCoalescer
+import shutil
+import sqlite3
+import threading
+import time
+import asyncio
+import re
+from django.template.loader import render_to_string
+from .events import get_backend
+from .sse import task_events_app
+from .staticfiles import StaticFilesMiddleware
+from .throttle import client_ip, take_tokens
+from .hashers import PASSWORD_HASH_SECONDS
+from .analytics import day_bounds, histogram, histogram_percentile, rollup_day
+from django.test import RequestFactory, override_settings
+from django.http import HttpResponse
+import gzip
+import numpy as np
+import os
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from .models import ArchivedTask, DailyCompletionRollup, TaskTombstone
 from .views import (
     HomeView,
     TaskCreateView,
+    TaskListView,
     User,
     Task,
+    TaskStats,
     TaskUpdateView,
     TaskDetailView,
     TaskDeleteView,
     UserCreationForm,
     AdminUserList,
+    ArchivedTaskListView,
 )
 
 # Create your tests here.
@@ -37,6 +88,60 @@ class TaskCreateViewTest(TestCase):
         self.assertEqual(found.func.__name__, TaskCreateView.as_view().__name__)
 
 
+class TaskListViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        other = User.objects.create_user(username="other", password="testpassword")
+        now = timezone.now()
+        # mix of complete, incomplete and tasks without deadline
+        for i in range(7):
+            Task.objects.create(
+                title=f"Task {i}",
+                text="Test Text",
+                user=self.user,
+                complete=i % 3 == 0,
+                date_planned_completion=None if i % 2 else now + timedelta(days=i),
+            )
+        Task.objects.create(title="Other", text="Test Text", user=other)
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_list_view_uses_correct_template(self):
+        response = self.client.get(reverse("task"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "task.html")
+
+    # walk all pages with the cursor and check that pages do not overlap and keep the ordering
+    def test_keyset_pages_cover_all_tasks_in_order(self):
+        seen = []
+        cursor = None
+        with patch.object(TaskListView, "page_size", 3):
+            while True:
+                url = reverse("task") + (f"?cursor={cursor}" if cursor else "")
+                response = self.client.get(url)
+                seen += [task.pk for task in response.context["tasks"]]
+                cursor = response.context["next_cursor"]
+                if cursor is None:
+                    break
+        expected = list(
+            Task.objects.filter(user=self.user)
+            .order_by("complete", "date_planned_completion", "pk")
+            .values_list("pk", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("task") + "?cursor=nonsense")
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_values_of_the_wrong_type_returns_404(self):
+        cursor = encode_cursor([False, 123, 1])
+        for name in ("task", "api_tasks"):
+            response = self.client.get(reverse(name), {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+
 class TaskUpdateViewTest(TestCase):
     def test_view_uses_correct_template(self):
         response = self.client.get(reverse_lazy("edit_task"))
@@ -57,6 +162,8 @@ class TaskUpdateViewTest(TestCase):
 
     # Testing if the correct template is being used for the update view
     def test_update_view_uses_correct_template(self):
+        # only the owner of the task can edit it
+        self.client.login(username="testuser", password="testpassword")
         # GET request if is used correct template for update view  self task.pk is primary key of task
         response = self.client.get(reverse("edit_task", args=[self.task.pk]))
         # assert if response code is 200
@@ -79,6 +186,7 @@ class TaskDetailViewTest(TestCase):
         )
 
     def test_detail_view_uses_correct_template(self):
+        self.client.login(username="testuser", password="testpassword")
         response = self.client.get(reverse("detail_task", args=[self.task.pk]))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "detail_task.html")
@@ -120,6 +228,1494 @@ class TaskDeleteViewTest(TestCase):
     path("delete_task/<int:pk>/", TaskDeleteView.as_view(), name="delete_task"),
 
 
+class TaskListCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.task = Task.objects.create(
+            title="Test Title", text="Test Text", user=self.user
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_repeated_reads_come_from_cache(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse("task"))
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(reverse("task"))
+        self.assertLess(len(second), len(first))
+        self.assertFalse(
+            any('"core_task"' in query["sql"] for query in second.captured_queries)
+        )
+        self.assertContains(response, "Test Title")
+
+    def test_writes_invalidate_cached_list(self):
+        self.client.get(reverse("task"))
+        self.task.title = "Changed title"
+        self.task.save()
+        self.assertContains(self.client.get(reverse("task")), "Changed title")
+        Task.objects.filter(pk=self.task.pk).update(title="Bulk title")
+        self.assertContains(self.client.get(reverse("task")), "Bulk title")
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertNotContains(self.client.get(reverse("task")), "Bulk title")
+
+    def test_write_during_read_is_not_cached_as_current(self):
+        from .views import paginate_keyset
+
+        def read_then_write(*args, **kwargs):
+            page = paginate_keyset(*args, **kwargs)
+            Task.objects.create(title="Meanwhile", text="Test Text", user=self.user)
+            return page
+
+        with patch("core.views.paginate_keyset", read_then_write):
+            self.assertNotContains(self.client.get(reverse("task")), "Meanwhile")
+        self.assertContains(self.client.get(reverse("task")), "Meanwhile")
+
+    def test_deploy_check_warns_about_per_process_cache(self):
+        from .checks import check_shared_cache
+
+        self.assertEqual([w.id for w in check_shared_cache(None)], ["core.W001"])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with self.settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.task = Task.objects.create(
+            title="Test Title", text="Test Text", user=self.user
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_task_list_not_modified(self):
+        response = self.client.get(reverse("task"))
+        etag = response["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("task"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            any('"core_task"' in query["sql"] for query in queries.captured_queries)
+        )
+        Task.objects.filter(pk=self.task.pk).delete()
+        response = self.client.get(reverse("task"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_detail_not_modified(self):
+        url = reverse("detail_task", args=[self.task.pk])
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.task.title = "Changed title"
+        self.task.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_reads_the_stats_once(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("task"))
+        self.assertEqual(response.context["count"], 1)
+        self.assertEqual(
+            len([q for q in queries.captured_queries if "core_taskstats" in q["sql"]]),
+            1,
+        )
+
+    def test_pages_are_revalidated_and_keep_flash_messages(self):
+        response = self.client.get(reverse("task"))
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        etag = response["ETag"]
+        # an invalid bulk action redirects back with an error message
+        self.client.post(reverse("bulk_task"), {"action": "complete", "tasks": ""})
+        response = self.client.get(reverse("task"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(list(response.context["messages"]))
+        response = self.client.get(reverse("task"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+
+class TaskStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.past = timezone.now() - timedelta(days=1)
+
+    def assertStats(self, total, complete, incomplete, overdue):
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.total, stats.complete, stats.incomplete, stats.overdue),
+            (total, complete, incomplete, overdue),
+        )
+
+    def test_counters_follow_create_update_delete(self):
+        task = Task.objects.create(
+            title="Test Title",
+            text="Test Text",
+            user=self.user,
+            date_planned_completion=self.past,
+        )
+        Task.objects.create(title="Test Title", text="Test Text", user=self.user)
+        self.assertStats(2, 0, 2, 1)
+        task = Task.objects.get(pk=task.pk)
+        task.complete = True
+        task.save()
+        self.assertStats(2, 1, 1, 0)
+        task.delete()
+        self.assertStats(1, 0, 1, 0)
+
+    def test_counters_follow_bulk_operations(self):
+        Task.objects.bulk_create(
+            [Task(title="Bulk", text="Test Text", user=self.user) for i in range(5)]
+        )
+        self.assertStats(5, 0, 5, 0)
+        Task.objects.filter(user=self.user).update(date_planned_completion=self.past)
+        self.assertStats(5, 0, 5, 5)
+        pks = list(Task.objects.values_list("pk", flat=True)[:2])
+        Task.objects.filter(pk__in=pks).update(complete=True)
+        self.assertStats(5, 2, 3, 3)
+        Task.objects.filter(pk__in=pks).delete()
+        self.assertStats(3, 0, 3, 3)
+
+    def test_update_changes_counters_by_the_updated_rows_only(self):
+        other = User.objects.create_user(username="other", password="testpassword")
+        Task.objects.bulk_create(
+            [Task(title="Bulk", text="Test Text", user=self.user) for i in range(30)]
+        )
+        task = Task.objects.filter(user=self.user).first()
+        with CaptureQueriesContext(connection) as captured:
+            Task.objects.filter(pk=task.pk).update(date_planned_completion=self.past)
+        self.assertStats(30, 0, 30, 1)
+        # no recount or overdue refresh over all tasks of the user
+        self.assertFalse(
+            [q for q in captured.captured_queries if '"user_id" IN' in q["sql"]]
+        )
+        Task.objects.filter(pk=task.pk).update(user=other)
+        self.assertStats(29, 0, 29, 0)
+        stats = TaskStats.objects.get(user=other)
+        self.assertEqual((stats.total, stats.overdue), (1, 1))
+        call_command("rebuild_task_stats", "--check", stdout=StringIO())
+
+    def test_rebuild_command_repairs_drift(self):
+        Task.objects.create(title="Test Title", text="Test Text", user=self.user)
+        TaskStats.objects.filter(user=self.user).update(total=10)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_task_stats", "--check", stdout=StringIO())
+        call_command("rebuild_task_stats", stdout=StringIO())
+        self.assertStats(1, 0, 1, 0)
+        call_command("rebuild_task_stats", "--check", stdout=StringIO())
+
+    def test_sweeper_flags_passed_deadlines(self):
+        soon = timezone.now() + timedelta(minutes=5)
+        for i in range(3):
+            Task.objects.create(
+                title="Test Title",
+                text="Test Text",
+                user=self.user,
+                date_planned_completion=soon,
+            )
+        Task.objects.create(
+            title="Test Title",
+            text="Test Text",
+            user=self.user,
+            complete=True,
+            date_planned_completion=soon,
+        )
+        self.assertStats(4, 1, 3, 0)
+        later = soon + timedelta(minutes=1)
+        with patch("django.utils.timezone.now", return_value=later):
+            call_command("sweep_overdue", "--batch-size", "2", stdout=StringIO())
+        self.assertStats(4, 1, 3, 3)
+        self.assertEqual(Task.objects.filter(is_overdue=True).count(), 3)
+        self.assertEqual(Task.objects.sweep_overdue(later), 0)
+
+    def test_task_list_reads_counters(self):
+        Task.objects.create(title="Test Title", text="Test Text", user=self.user)
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(reverse("task"))
+        self.assertEqual(response.context["count"], 1)
+        self.assertEqual(response.context["done"], 0)
+
+
+class TaskExportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        other = User.objects.create_user(username="other", password="testpassword")
+        for i in range(3):
+            Task.objects.create(title=f"Task {i}", text="Test Text", user=self.user)
+        Task.objects.create(title="Other", text="Test Text", user=other)
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_export_ndjson_streams_own_tasks(self):
+        with patch("core.export.EXPORT_CHUNK_SIZE", 2):
+            response = self.client.get(reverse("export_task") + "?format=ndjson")
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["title"] for row in rows], ["Task 0", "Task 1", "Task 2"])
+        self.assertEqual({row["user"] for row in rows}, {"testuser"})
+
+    def test_export_includes_archived_tasks(self):
+        task = Task.objects.get(title="Task 0")
+        Task.objects.filter(pk=task.pk).update(complete=True)
+        ArchivedTask.archive(timezone.now() + timedelta(minutes=1))
+        response = self.client.get(reverse("export_task") + "?format=ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row["title"] for row in rows], ["Task 1", "Task 2", "Task 0"])
+        self.assertEqual(
+            (rows[-1]["id"], rows[-1]["complete"], rows[-1]["archived"]),
+            (task.pk, True, True),
+        )
+        self.assertFalse(rows[0]["archived"])
+
+    def test_export_csv(self):
+        response = self.client.get(reverse("export_task") + "?format=csv")
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0][:3], ["id", "user", "title"])
+        self.assertEqual(len(rows), 4)
+
+    def test_export_all_requires_staff(self):
+        response = self.client.get(reverse("export_task") + "?all=1")
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command("export_tasks", "--format", "ndjson", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+class TaskImportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+
+    def test_import_validates_rows_and_inserts_in_batches(self):
+        rows = [
+            {
+                "title": "Valid title",
+                "text": "Long enough text",
+                "date_planned_completion": "2030-01-01T10:00:00+00:00",
+            },
+            {
+                "title": "abc",
+                "text": "Long enough text",
+                "date_planned_completion": "2030-01-01T10:00:00+00:00",
+            },
+            {
+                "title": "Valid title",
+                "text": "short",
+                "date_planned_completion": "2030-01-01T10:00:00+00:00",
+            },
+            {
+                "title": "Second valid",
+                "text": "Long enough text",
+                "complete": True,
+                "date_planned_completion": "2030-01-02T10:00:00+00:00",
+            },
+        ]
+        stream = StringIO("\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+        result = import_tasks(stream, self.user, "ndjson", batch_size=1)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, errors in result.errors], [2, 3, 5])
+        self.assertEqual(result.rejected, 3)
+        self.assertEqual(Task.objects.filter(user=self.user, complete=True).count(), 1)
+        self.assertEqual(TaskStats.objects.get(user=self.user).total, 2)
+
+    def test_import_view_with_csv(self):
+        self.client.login(username="testuser", password="testpassword")
+        # with the byte order mark spreadsheets write in front of UTF-8
+        upload = SimpleUploadedFile(
+            "tasks.csv",
+            b"\xef\xbb\xbftitle,text,date_planned_completion\n"
+            b"Valid title,Long enough text,2030-01-01 10:00\n"
+            b"abc,Long enough text,2030-01-01 10:00\n",
+        )
+        response = self.client.post(
+            reverse("import_task"), {"file": upload, "format": "csv"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"].created, 1)
+        self.assertEqual(response.context["errors"][0][0], 3)
+
+    def test_only_the_first_errors_are_kept(self):
+        stream = StringIO("not json\n" * (IMPORT_MAX_ERRORS + 20))
+        result = import_tasks(stream, self.user, "ndjson")
+        self.assertEqual(result.rejected, IMPORT_MAX_ERRORS + 20)
+        self.assertEqual(len(result.errors), IMPORT_MAX_ERRORS)
+        self.assertEqual(result.errors[-1][0], IMPORT_MAX_ERRORS)
+
+    def test_unreadable_file_reports_the_rows_already_imported(self):
+        self.client.login(username="testuser", password="testpassword")
+        # more than one 8 KiB decoding chunk of good lines before the bad byte
+        lines = [
+            json.dumps(
+                {
+                    "title": f"Task {i}",
+                    "text": "Long enough text",
+                    "date_planned_completion": "2030-01-01T10:00:00+00:00",
+                }
+            )
+            for i in range(400)
+        ]
+        upload = SimpleUploadedFile(
+            "tasks.ndjson", "\n".join(lines).encode() + b"\n\xff\xfe broken\n"
+        )
+        response = self.client.post(
+            reverse("import_task"), {"file": upload, "format": "ndjson"}
+        )
+        created = response.context["result"].created
+        self.assertGreater(created, 0)
+        self.assertLess(created, 400)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), created)
+        message = str(list(response.context["messages"])[0])
+        self.assertIn("could not be read after line", message)
+        self.assertIn(f"Imported {created} tasks", message)
+
+
+class TaskBatchApiTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        # the counters row exists from now on, like for every user with tasks
+        Task.objects.create(title="Existing", text="Test Text", user=self.user)
+        self.client.login(username="testuser", password="testpassword")
+
+    def post_json(self, name, data):
+        return self.client.post(
+            reverse(name), json.dumps(data), content_type="application/json"
+        )
+
+    def create_tasks(self, count):
+        return self.post_json(
+            "api_batch_create",
+            {
+                "tasks": [
+                    {
+                        "title": f"Task {i}",
+                        "text": "Long enough text",
+                        "date_planned_completion": "2030-01-01T10:00:00+00:00",
+                    }
+                    for i in range(count)
+                ]
+            },
+        )
+
+    # the number of statements must not depend on the number of tasks
+    def test_batch_endpoints_run_fixed_number_of_queries(self):
+        for count in (2, 20):
+            with CaptureQueriesContext(connection) as create:
+                response = self.create_tasks(count)
+            self.assertEqual(response.status_code, 201)
+            ids = [task["id"] for task in response.json()["tasks"]]
+            with CaptureQueriesContext(connection) as update:
+                response = self.post_json(
+                    "api_batch_update", {"ids": ids, "complete": True}
+                )
+            self.assertEqual(response.json()["updated"], count)
+            with CaptureQueriesContext(connection) as delete:
+                response = self.post_json("api_batch_delete", {"ids": ids})
+            self.assertEqual(response.json()["deleted"], count)
+            if count == 2:
+                expected = (len(create), len(update), len(delete))
+        self.assertEqual(expected, (len(create), len(update), len(delete)))
+        self.assertEqual(TaskStats.objects.get(user=self.user).total, 1)
+
+    def test_batch_create_rejects_invalid_tasks(self):
+        response = self.post_json(
+            "api_batch_create", {"tasks": [{"title": "abc", "text": "short"}]}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("0", response.json()["errors"])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_batch_only_touches_own_tasks(self):
+        other = User.objects.create_user(username="other", password="testpassword")
+        task = Task.objects.create(title="Other", text="Test Text", user=other)
+        response = self.post_json("api_batch_delete", {"ids": [task.pk]})
+        self.assertEqual(response.json()["deleted"], 0)
+
+    def test_api_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("api_tasks"))
+        self.assertEqual(response.status_code, 401)
+
+
+class TaskSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.other = User.objects.create_user(username="other", password="x")
+        self.task = Task.objects.create(
+            title="Buy groceries", text="Milk, bread and <b>butter</b>", user=self.user
+        )
+        Task.objects.create(title="Groceries too", text="Test Text", user=self.other)
+
+    def test_search_is_ranked_and_scoped_to_user(self):
+        Task.objects.create(
+            title="Cooking", text="Take groceries from the car", user=self.user
+        )
+        tasks = search_tasks(self.user, "grocer")
+        # title matches weigh more than text matches
+        self.assertEqual([task.title for task in tasks], ["Buy groceries", "Cooking"])
+        self.assertIn("<mark>groceries</mark>", tasks[0].title_highlight)
+
+    def test_snippet_is_escaped(self):
+        tasks = search_tasks(self.user, "butter")
+        self.assertIn("&lt;b&gt;<mark>butter</mark>&lt;/b&gt;", tasks[0].snippet)
+
+    def test_index_follows_update_and_delete(self):
+        self.task.title = "Walk the dog"
+        self.task.save()
+        self.assertEqual(search_tasks(self.user, "groceries"), [])
+        self.assertEqual(len(search_tasks(self.user, "dog")), 1)
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertEqual(search_tasks(self.user, "dog"), [])
+
+    def test_search_view(self):
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.get(reverse("search_task") + "?q=milk")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["tasks"][0].pk, self.task.pk)
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class TaskSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", text="Test Text", user=self.user)
+            for i in range(3)
+        ]
+        self.client.login(username="testuser", password="testpassword")
+
+    def sync(self, cursor=None):
+        url = reverse("api_sync") + (f"?cursor={cursor}" if cursor else "")
+        return self.client.get(url).json()
+
+    def test_sync_returns_only_changes_since_cursor(self):
+        first = self.sync()
+        pks = [task.pk for task in self.tasks]
+        self.assertEqual(len(first["changed"]), 3)
+        self.assertEqual(self.sync(first["cursor"])["changed"], [])
+        self.tasks[0].title = "Changed title"
+        self.tasks[0].save()
+        self.tasks[1].delete()
+        Task.objects.filter(pk=self.tasks[2].pk).delete()
+        new = Task.objects.create(title="New", text="Test Text", user=self.user)
+        delta = self.sync(first["cursor"])
+        self.assertEqual([task["id"] for task in delta["changed"]], [pks[0], new.pk])
+        self.assertEqual(sorted(delta["deleted"]), pks[1:])
+        self.assertEqual(self.sync(delta["cursor"])["changed"], [])
+
+    def test_sync_pages_through_equal_timestamps(self):
+        Task.objects.filter(user=self.user).update(title="Same time")
+        Task.objects.filter(pk=self.tasks[0].pk).delete()
+        seen, cursor = [], None
+        while True:
+            changes = changes_since(self.user, cursor, limit=1)
+            seen += [task.pk for task in changes["changed"]] + changes["deleted"]
+            cursor = changes["cursor"]
+            if not changes["has_more"]:
+                break
+        # the first page has no tombstones, the delete comes with a later page
+        self.assertEqual(sorted(seen), sorted(task.pk for task in self.tasks))
+
+    def test_quiet_account_is_not_reset_after_a_full_sync(self):
+        Task.objects.filter(user=self.user).update_flags(
+            updated_at=timezone.now() - timedelta(days=60)
+        )
+        first = self.sync()
+        self.assertEqual(len(first["changed"]), 3)
+        again = self.sync(first["cursor"])
+        self.assertFalse(again["reset"])
+        self.assertEqual(again["changed"], [])
+        pk = self.tasks[0].pk
+        self.tasks[0].delete()
+        self.assertEqual(self.sync(again["cursor"])["deleted"], [pk])
+
+    def test_late_commit_comes_with_the_next_sync(self):
+        # a write that took its timestamp before the sync, committed after it
+        before = timezone.now() - timedelta(seconds=5)
+        with self.settings(SYNC_OVERLAP_SECONDS=30):
+            first = self.sync()
+            late = Task.objects.create(title="Late", text="Test Text", user=self.user)
+            Task.objects.filter(pk=late.pk).update_flags(updated_at=before)
+            pk = self.tasks[0].pk
+            self.tasks[0].delete()
+            TaskTombstone.objects.update(deleted_at=before)
+            again = self.sync(first["cursor"])
+        # the tasks of the first sync again, the client applies them once more
+        self.assertIn(late.pk, [task["id"] for task in again["changed"]])
+        self.assertEqual(again["deleted"], [pk])
+
+    def test_old_cursor_gets_reset_and_tombstones_are_compacted(self):
+        first = self.sync()
+        self.tasks[0].delete()
+        TaskTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        with self.settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            self.assertTrue(self.sync(first["cursor"])["reset"])
+        call_command("compact_tombstones", stdout=StringIO())
+        self.assertEqual(TaskTombstone.objects.count(), 0)
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.other = User.objects.create_user(username="other", password="password")
+        self.task = Task.objects.create(
+            title="Task 1", text="Test Text", user=self.user
+        )
+        self.other_task = Task.objects.create(
+            title="Other", text="Test Text", user=self.other
+        )
+        self.async_client.force_login(self.user)
+
+    async def test_async_task_list(self):
+        response = await self.async_client.get(reverse("async_task"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Task 1")
+        self.assertNotContains(response, "Other")
+        self.assertEqual(response.context["count"], 1)
+
+    async def test_async_detail_is_scoped_to_owner(self):
+        response = await self.async_client.get(
+            reverse("async_detail_task", args=[self.task.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(
+            reverse("async_detail_task", args=[self.other_task.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_api_and_sync(self):
+        response = await self.async_client.get(reverse("api_async_tasks") + "?count=1")
+        data = response.json()
+        self.assertEqual([task["id"] for task in data["tasks"]], [self.task.pk])
+        self.assertEqual(data["count"], 1)
+        response = await self.async_client.get(reverse("api_async_sync"))
+        self.assertEqual(len(response.json()["changed"]), 1)
+
+    async def test_async_views_require_login(self):
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(reverse("async_task"))
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.get(reverse("api_async_tasks"))
+        self.assertEqual(response.status_code, 401)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        Task.objects.create(title="Task 1", text="Test Text", user=self.user)
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_metrics_are_staff_only(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_requests_are_counted_per_view(self):
+        cache.clear()
+        before = REQUEST_QUERIES.values.get(("task",), (None, 0))[1]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("task"))
+        executed = len(queries)
+        self.assertEqual(REQUEST_QUERIES.values[("task",)][1] - before, executed)
+        self.user.is_staff = True
+        self.user.save()
+        text = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn("# TYPE todo_request_duration_seconds histogram", text)
+        self.assertIn('todo_request_duration_seconds_count{view="task"}', text)
+        self.assertIn('todo_responses_total{view="task",status="200"}', text)
+        self.assertIn('todo_template_render_seconds_total{view="task"}', text)
+
+    def test_render_to_string_is_timed_once(self):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            with patch("core.metrics.time.perf_counter", side_effect=[1.0, 3.0]):
+                # base.html and the included navbar are one measured render
+                render_to_string("login.html", {"form": None})
+        finally:
+            current_stats.reset(token)
+        self.assertEqual(stats.template_seconds, 2.0)
+
+    def test_async_view_render_is_timed(self):
+        before = TEMPLATE_SECONDS.values.get(("async_task",), 0)
+        self.client.get(reverse("async_task"))
+        self.assertGreater(TEMPLATE_SECONDS.values[("async_task",)], before)
+
+
+class BenchmarkTest(TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_seed_and_benchmark(self):
+        call_command("seed_tasks", "--users", "3", "--tasks", "5", stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith="bench_").count(), 3)
+        stats = TaskStats.objects.get(user__username="bench_user_0")
+        self.assertEqual(stats.total, Task.objects.filter(user=stats.user).count())
+        # created before completed, days back rather than all at once
+        done = Task.objects.filter(complete=True)
+        self.assertTrue(done)
+        self.assertFalse(done.filter(date_completion__lt=F("date_created")))
+        self.assertLess(
+            Task.objects.order_by("date_created").first().date_created,
+            timezone.now() - timedelta(hours=1),
+        )
+        User.objects.filter(username="bench_user_1").update(is_staff=True)
+        tasks = Task.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "benchmark.json")
+            call_command(
+                "benchmark",
+                "--requests",
+                "3",
+                "--memory-requests",
+                "1",
+                "--output",
+                output,
+                stdout=StringIO(),
+            )
+            with open(output) as report:
+                results = json.load(report)["results"]
+        self.assertEqual(
+            set(results), {"task", "userlist", "detail_task", "add_task", "edit_task"}
+        )
+        self.assertEqual(results["task"]["status"], {"200": 3})
+        self.assertEqual(results["add_task"]["status"], {"302": 3})
+        self.assertGreater(results["task"]["queries_max"], 0)
+        # the writer and the created tasks were purged, no sessions are left
+        self.assertEqual(Task.objects.count(), tasks)
+        self.assertFalse(User.objects.filter(username__startswith="benchmark_writer_"))
+        self.assertFalse(Session.objects.exists())
+
+
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_router_reads_replica_only_when_asked(self):
+        router = ReplicaRouter()
+        with self.settings(REPLICA_DATABASE="replica"):
+            self.assertEqual(router.db_for_read(Task), "default")
+            with read_from_replica():
+                self.assertEqual(router.db_for_read(Task), "replica")
+                self.assertEqual(router.db_for_write(Task), "default")
+        with read_from_replica():
+            self.assertEqual(router.db_for_read(Task), "default")
+
+    def test_reads_after_own_write_use_primary(self):
+        with self.settings(REPLICA_DATABASE="replica"), patch(
+            "core.views.read_from_replica"
+        ) as replica:
+            self.client.get(reverse("task"))
+            self.assertEqual(replica.call_count, 1)
+            response = self.client.post(
+                reverse("add_task"),
+                {
+                    "title": "Task 1",
+                    "text": "Test Text long enough",
+                    "date_planned_completion": "2030-01-01T10:00",
+                },
+            )
+            self.assertEqual(response.status_code, 302)
+            self.assertIn(PIN_COOKIE, response.cookies)
+            # another worker serves the next read, the pin travels with the client
+            cache.clear()
+            self.client.get(reverse("task"))
+            self.assertEqual(replica.call_count, 1)
+            del self.client.cookies[PIN_COOKIE]
+            self.client.get(reverse("task"))
+            self.assertEqual(replica.call_count, 2)
+
+
+class WriteCoalescerTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+
+    def test_sqlite_busy_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_concurrent_writes_share_a_transaction(self):
+        coalescer = WriteCoalescer(max_batch=10, max_wait=0.2)
+        results = {}
+
+        def write(i):
+            def create():
+                if i == 3:
+                    raise ValueError("bad task")
+                return Task.objects.create(
+                    title=f"Task {i}", text="Test Text", user=self.user
+                )
+
+            try:
+                results[i] = coalescer.submit(create)
+            except ValueError as exc:
+                results[i] = exc
+
+        before = WRITE_BATCH_SIZE.values.get((), (None, 0))[1]
+        threads = [threading.Thread(target=write, args=[i]) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(Task.objects.count(), 4)
+        self.assertEqual(TaskStats.objects.get(user=self.user).total, 4)
+        self.assertEqual(results[0].title, "Task 0")
+        # every write went through a batch, the failed one included
+        batches = WRITE_BATCH_SIZE.values[()]
+        self.assertEqual(batches[1] - before, 5)
+
+    def test_concurrent_update_and_create_are_not_locked_out(self):
+        # the in-memory test database locks by table, copy it to a file in WAL
+        # mode for the threads; update() reads before it writes
+        path = os.path.join(tempfile.mkdtemp(), "db.sqlite3")
+        target = sqlite3.connect(path)
+        connection.ensure_connection()
+        connection.connection.backup(target)
+        target.close()
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        name = connections.settings["default"]["NAME"]
+        connections.settings["default"]["NAME"] = path
+        self.addCleanup(connections.settings["default"].__setitem__, "NAME", name)
+        errors = []
+        stop = time.perf_counter() + 1.5
+
+        def repeat(write):
+            while time.perf_counter() < stop:
+                try:
+                    write()
+                except OperationalError as exc:
+                    errors.append(exc)
+            connections["default"].close()
+
+        threads = [
+            threading.Thread(
+                target=repeat,
+                args=[
+                    lambda: Task.objects.filter(user=self.user).update(complete=True)
+                ],
+            ),
+            threading.Thread(
+                target=repeat,
+                args=[
+                    lambda: Task.objects.create(
+                        title="Task", text="Test Text", user=self.user
+                    )
+                ],
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_benchmark_with_coalescing(self):
+        call_command("seed_tasks", "--users", "1", "--tasks", "5", stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "benchmark.json")
+            with self.settings(TASK_WRITE_COALESCING=True):
+                call_command(
+                    "benchmark",
+                    "--requests",
+                    "3",
+                    "--memory-requests",
+                    "1",
+                    "--output",
+                    output,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+            with open(output) as report:
+                report = json.load(report)
+        self.assertTrue(report["write_coalescing"])
+        self.assertEqual(report["results"]["add_task"]["status"], {"302": 3})
+
+    def test_create_view_with_coalescing(self):
+        self.client.login(username="testuser", password="testpassword")
+        with self.settings(TASK_WRITE_COALESCING=True):
+            response = self.client.post(
+                reverse("add_task"),
+                {
+                    "title": "Test Title",
+                    "text": "Test Text long enough",
+                    "date_planned_completion": "2030-01-01T12:00",
+                },
+            )
+        self.assertRedirects(response, reverse("task"))
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_completion_date_follows_complete(self):
+        task = Task.objects.create(title="Task", text="Test Text", user=self.user)
+        self.assertIsNone(task.date_completion)
+        task.complete = True
+        task.save()
+        self.assertIsNotNone(task.date_completion)
+        Task.objects.filter(pk=task.pk).update(complete=False)
+        self.assertIsNone(Task.objects.get(pk=task.pk).date_completion)
+        Task.objects.filter(pk=task.pk).update(complete=True)
+        self.assertIsNotNone(Task.objects.get(pk=task.pk).date_completion)
+
+    def test_archive_moves_old_completed_tasks(self):
+        old = timezone.now() - timedelta(days=100)
+        for i in range(3):
+            Task.objects.create(
+                title=f"Old {i}", text="Test Text", user=self.user, complete=True
+            )
+        Task.objects.create(
+            title="Recent", text="Test Text", user=self.user, complete=True
+        )
+        Task.objects.create(title="Open", text="Test Text", user=self.user)
+        Task.objects.filter(title__startswith="Old").update(date_completion=old)
+        call_command(
+            "archive_tasks", "--days", "30", "--batch-size", "2", stdout=StringIO()
+        )
+        self.assertEqual(ArchivedTask.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            sorted(Task.objects.values_list("title", flat=True)), ["Open", "Recent"]
+        )
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.total, stats.complete), (2, 1))
+        with patch.object(ArchivedTaskListView, "page_size", 2):
+            response = self.client.get(reverse("archived_task"))
+            self.assertEqual(len(response.context["tasks"]), 2)
+            response = self.client.get(
+                reverse("archived_task"), {"cursor": response.context["next_cursor"]}
+            )
+        self.assertEqual(len(response.context["tasks"]), 1)
+        self.assertIsNone(response.context["next_cursor"])
+
+
+class TaskBulkActionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.other = User.objects.create_user(username="other", password="password")
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", text="Test Text", user=self.user)
+            for i in range(3)
+        ]
+        self.other_task = Task.objects.create(
+            title="Other", text="Test Text", user=self.other
+        )
+        self.client.login(username="testuser", password="testpassword")
+
+    def post(self, action, tasks, **data):
+        return self.client.post(
+            reverse("bulk_task"),
+            {"action": action, "tasks": [task.pk for task in tasks], **data},
+        )
+
+    def test_complete_selected_tasks_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post("complete", self.tasks[:2] + [self.other_task])
+        # one statement for the selection, the rest only refreshes overdue flags
+        updates = [q for q in queries if 'SET "complete"' in q["sql"]]
+        self.assertRedirects(response, reverse("task"))
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Task.objects.filter(complete=True).count(), 2)
+        stats = TaskStats.objects.get(user=self.user)
+        self.assertEqual((stats.complete, stats.incomplete), (2, 1))
+
+    def test_set_deadline_and_delete(self):
+        response = self.post(
+            "deadline", self.tasks, date_planned_completion="2030-01-01T12:00"
+        )
+        self.assertEqual(
+            Task.objects.filter(date_planned_completion__year=2030).count(), 3
+        )
+        response = self.post("delete", self.tasks[1:] + [self.other_task])
+        self.assertRedirects(response, reverse("task"))
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+        self.assertTrue(Task.objects.filter(pk=self.other_task.pk).exists())
+        self.assertEqual(TaskStats.objects.get(user=self.user).total, 1)
+
+    def test_deadline_is_required(self):
+        response = self.post("deadline", self.tasks)
+        self.assertRedirects(response, reverse("task"))
+        self.assertEqual(Task.objects.exclude(date_planned_completion=None).count(), 0)
+
+
+class TaskEventsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.client.login(username="testuser", password="testpassword")
+        self.scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/events",
+            "headers": [
+                (b"cookie", f"sessionid={self.client.session.session_key}".encode())
+            ],
+        }
+
+    def test_writes_publish_events_after_commit(self):
+        published = []
+        backend = type("Backend", (), {"publish": lambda self, *e: published.append(e)})
+        with patch("core.events.get_backend", return_value=backend()):
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(
+                    title="Task 1", text="Test Text", user=self.user
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.filter(pk=task.pk).update(complete=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.filter(pk=task.pk).delete()
+        self.assertEqual(
+            [event["type"] for user_id, event in published],
+            ["created", "updated", "deleted"],
+        )
+        self.assertEqual(published[1][1]["tasks"][0]["complete"], True)
+        self.assertEqual(
+            published[2], (self.user.pk, {"type": "deleted", "ids": [task.pk]})
+        )
+
+    @override_settings(TASK_EVENTS=False)
+    def test_disabled_events_read_and_schedule_nothing(self):
+        task = Task.objects.create(title="Task 1", text="Test Text", user=self.user)
+        with CaptureQueriesContext(connection) as captured:
+            with self.captureOnCommitCallbacks() as callbacks:
+                Task.objects.filter(pk=task.pk).update(title="Renamed")
+                Task.objects.filter(pk=task.pk).update(complete=True)
+        # the cache invalidation only, no publishing after the commit
+        self.assertFalse(
+            [func for func in callbacks if func.__module__ == "core.events"]
+        )
+        # no limited SELECT of the rows for the event
+        self.assertFalse([q for q in captured.captured_queries if "LIMIT" in q["sql"]])
+
+    async def test_stream_sends_events_of_the_user(self):
+        sent = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        app = asyncio.ensure_future(task_events_app(self.scope, receive, send))
+        backend = get_backend()
+        while self.user.pk not in backend.subscribers:
+            await asyncio.sleep(0.01)
+        backend.publish(self.user.pk, {"type": "deleted", "ids": [1]})
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        disconnected.set()
+        await app
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), sent[0]["headers"])
+        self.assertEqual(sent[2]["body"], b'data: {"type": "deleted", "ids": [1]}\n\n')
+        self.assertNotIn(self.user.pk, backend.subscribers)
+
+    async def test_stream_requires_login(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await task_events_app({**self.scope, "headers": []}, None, send)
+        self.assertEqual(sent[0]["status"], 403)
+
+
+class TaskRowsTagTest(TestCase):
+    def normalize(self, html):
+        html = re.sub(r"<!--.*?-->", "", html, flags=re.S)
+        return re.sub(r"\s*([<>])\s*", r"\1", re.sub(r"\s+", " ", html)).strip()
+
+    def test_tag_renders_like_the_template(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        now = timezone.now()
+        Task.objects.create(title="<b>Open</b> & co", text="Test Text", user=user)
+        Task.objects.create(
+            title="Later",
+            text="Test Text",
+            user=user,
+            date_planned_completion=now + timedelta(days=2, hours=3),
+        )
+        Task.objects.create(
+            title="Late",
+            text="Test Text",
+            user=user,
+            date_planned_completion=now - timedelta(days=1),
+        )
+        Task.objects.create(title="Done", text="Test Text", user=user, complete=True)
+        tasks = list(Task.objects.order_by("pk"))
+        reference = render_to_string("task_rows_reference.html", {"tasks": tasks})
+        fast = render_to_string("task_rows.html", {"tasks": tasks})
+        self.assertEqual(self.normalize(fast), self.normalize(reference))
+        self.assertIn("&lt;b&gt;Open&lt;/b&gt; &amp; co", fast)
+        self.assertIn("Overdue", fast)
+        self.assertIn("2\xa0days", fast)
+
+    def test_benchmark_rows_command(self):
+        out = StringIO()
+        call_command("benchmark_rows", "--rows", "20", "--repeat", "2", stdout=out)
+        self.assertIn("faster", out.getvalue())
+
+
+class StaticFilesTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings = override_settings(
+            STATIC_ROOT=self.root.name,
+            STATIC_PRODUCTION=True,
+            STATICFILES_STORAGE="core.staticfiles.CompressedManifestStaticFilesStorage",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", "--noinput", verbosity=0)
+        with open(os.path.join(self.root.name, "staticfiles.json")) as manifest:
+            self.paths = json.load(manifest)["paths"]
+        self.hashed = self.paths["js/task_events.js"]
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse("app"))
+
+    def test_collectstatic_writes_hashed_and_gzip_files(self):
+        self.assertRegex(self.hashed, r"^js/task_events\.[0-9a-f]{12}\.js$")
+        path = os.path.join(self.root.name, self.hashed)
+        with open(path, "rb") as original, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(compressed.read(), original.read())
+        # too small to be worth compressing
+        small = os.path.join(self.root.name, self.paths["js/main.js"])
+        self.assertFalse(os.path.exists(small + ".gz"))
+
+    def test_serves_gzip_with_immutable_caching(self):
+        request = RequestFactory().get(
+            "/static/" + self.hashed, HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        body = b"".join(response.streaming_content)
+        self.assertIn(b"EventSource", gzip.decompress(body))
+
+    def test_identity_and_fallthrough(self):
+        factory = RequestFactory()
+        response = self.middleware(
+            factory.get("/static/" + self.hashed, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response.close()
+        response = self.middleware(factory.get("/static/js/task_events.js"))
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+        response.close()
+        for path in ("/static/missing.js", "/static/../settings.py", "/task/"):
+            self.assertEqual(self.middleware(factory.get(path)).content, b"app")
+
+    def test_async_chain_stays_async(self):
+        async def app(request):
+            return HttpResponse("app")
+
+        middleware = StaticFilesMiddleware(app)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        response = asyncio.run(middleware(factory.get("/static/" + self.hashed)))
+        self.assertIn("immutable", response["Cache-Control"])
+        response.close()
+        response = asyncio.run(middleware(factory.get("/task/")))
+        self.assertEqual(response.content, b"app")
+
+
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+
+    def hashes(self):
+        return sum(
+            sum(counts) for counts, total in PASSWORD_HASH_SECONDS.values.values()
+        )
+
+    @override_settings(LOGIN_THROTTLE_USERNAME=(2, 60))
+    def test_username_bucket_rejects_before_hashing(self):
+        data = {"username": "TestUser", "password": "wrong"}
+        for i in range(2):
+            self.assertEqual(self.client.post(reverse("login"), data).status_code, 200)
+        before = self.hashes()
+        response = self.client.post(
+            reverse("login"), {"username": "testuser", "password": "testpassword"}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.hashes(), before)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        # other usernames are not affected, nor the logged in task pages
+        response = self.client.post(
+            reverse("login"), {"username": "other", "password": "wrong"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("task")).status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_IP=(3, 60))
+    def test_ip_bucket_covers_login_and_register_separately(self):
+        for i in range(3):
+            response = self.client.post(
+                reverse("login"), {"username": f"user{i}", "password": "wrong"}
+            )
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse("login"),
+            {"username": "user9", "password": "wrong"},
+            REMOTE_ADDR="127.0.0.1",
+        )
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(
+            reverse("login"),
+            {"username": "user9", "password": "wrong"},
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse("register"), {"username": "new"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_ip_behind_trusted_proxies(self):
+        factory = RequestFactory()
+        request = factory.get(
+            "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4"
+        )
+        # direct clients can send any header
+        self.assertEqual(client_ip(request), "10.0.0.1")
+        with self.settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(client_ip(request), "1.2.3.4")
+            direct = factory.get("/", REMOTE_ADDR="10.0.0.1")
+            self.assertEqual(client_ip(direct), "10.0.0.1")
+        with self.settings(TRUSTED_PROXY_COUNT=2):
+            self.assertEqual(client_ip(request), "6.6.6.6")
+        with self.settings(TRUSTED_PROXY_COUNT=3):
+            self.assertEqual(client_ip(request), "10.0.0.1")
+
+    def test_bucket_refills(self):
+        buckets = [("ip", "10.0.0.1", 2, 10)]
+        self.assertEqual(take_tokens("test", buckets, now=100), 0)
+        self.assertEqual(take_tokens("test", buckets, now=100), 0)
+        self.assertAlmostEqual(take_tokens("test", buckets, now=100), 5)
+        self.assertAlmostEqual(take_tokens("test", buckets, now=104), 1)
+        self.assertEqual(take_tokens("test", buckets, now=105), 0)
+
+    def test_login_hash_time_is_measured(self):
+        before = self.hashes()
+        self.client.post(
+            reverse("login"), {"username": "testuser", "password": "testpassword"}
+        )
+        self.assertEqual(self.hashes(), before + 1)
+        self.assertIn("todo_password_hash_seconds_bucket", render_metrics())
+
+
+class OwnedTaskLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="owner", password="pw")
+        self.other = User.objects.create_user(username="other", password="pw")
+        self.task = Task.objects.create(title="Mine", text="Text", user=self.user)
+        self.client.force_login(self.user)
+
+    def task_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        queries = [q["sql"] for q in captured.captured_queries]
+        return response, [sql for sql in queries if 'FROM "core_task"' in sql]
+
+    def test_detail_then_edit_read_the_task_once(self):
+        response, queries = self.task_queries(
+            reverse("detail_task", args=[self.task.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"core_task"."user_id" =', queries[0])
+        response, queries = self.task_queries(reverse("edit_task", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_save_and_delete_invalidate(self):
+        url = reverse("detail_task", args=[self.task.pk])
+        self.client.get(url)
+        response = self.client.post(
+            reverse("edit_task", args=[self.task.pk]),
+            {
+                "title": "Renamed task",
+                "text": "Some longer text",
+                "date_planned_completion": "2030-01-01T10:00",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(self.client.get(url), "Renamed task")
+        Task.objects.filter(pk=self.task.pk).update(title="Bulk")
+        self.assertContains(self.client.get(url), "Bulk")
+        Task.objects.get(pk=self.task.pk).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_writes_do_not_use_the_cached_task(self):
+        self.client.get(reverse("detail_task", args=[self.task.pk]))
+        # another process archives the task, this process' cache is not bumped
+        Task.objects.filter(pk=self.task.pk).update_flags(
+            complete=True, date_completion=timezone.now()
+        )
+        with patch("core.models.tasks_changed"):
+            ArchivedTask.archive(timezone.now() + timedelta(days=1))
+        response = self.client.post(
+            reverse("edit_task", args=[self.task.pk]),
+            {
+                "title": "Renamed task",
+                "text": "Some longer text",
+                "date_planned_completion": "2030-01-01T10:00",
+            },
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+        self.assertEqual(TaskStats.for_user(self.user).total, 0)
+
+    def test_other_users_tasks_are_not_found(self):
+        self.client.force_login(self.other)
+        for name in ("detail_task", "edit_task", "delete_task"):
+            response = self.client.get(reverse(name, args=[self.task.pk]))
+            self.assertEqual(response.status_code, 404)
+        self.client.logout()
+        response = self.client.get(reverse("detail_task", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 302)
+
+
+class PurgeUsersTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="leaving", password="pw")
+        self.other = User.objects.create_user(username="staying", password="pw")
+        Task.objects.bulk_create(
+            Task(title=f"Task {i}", text="Text", user=self.user) for i in range(25)
+        )
+        Task.objects.create(title="Kept", text="Text", user=self.other)
+        first = list(Task.objects.filter(user=self.user).values_list("pk", flat=True))
+        Task.objects.filter(pk__in=first[:3]).delete()
+        archived = Task.objects.create(
+            title="Old", text="Text", user=self.user, complete=True
+        )
+        ArchivedTask.archive(timezone.now() + timedelta(days=1))
+        self.assertTrue(ArchivedTask.objects.filter(task_id=archived.pk).exists())
+
+    def test_command_deletes_in_batches(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as captured:
+            call_command("purge_users", "leaving", "--batch-size", "10", stdout=out)
+        deletes = [
+            q["sql"]
+            for q in captured.captured_queries
+            if q["sql"].startswith('DELETE FROM "core_task" WHERE "core_task"."id" IN')
+        ]
+        self.assertEqual(len(deletes), 3)
+        self.assertIn("22 core.Task", out.getvalue())
+        # three deleted plus one archived task
+        self.assertIn("4 core.TaskTombstone", out.getvalue())
+        self.assertIn("1 core.ArchivedTask", out.getvalue())
+        self.assertFalse(User.objects.filter(username="leaving").exists())
+        self.assertEqual(list(Task.objects.values_list("title", flat=True)), ["Kept"])
+        self.assertFalse(TaskTombstone.objects.exists())
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertEqual(TaskStats.for_user(self.other).total, 1)
+        with self.assertRaises(CommandError):
+            call_command("purge_users", "nobody", stdout=StringIO())
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:auth_user_changelist"),
+            {"action": "purge_users", "_selected_action": [self.user.pk, admin.pk]},
+            follow=True,
+        )
+        self.assertContains(response, "Purged leaving")
+        self.assertContains(response, "cannot purge your own account")
+        self.assertEqual(
+            set(User.objects.values_list("username", flat=True)), {"admin", "staying"}
+        )
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class BatchCommandTest(TestCase):
+    def test_batch_options_are_shared_and_checked(self):
+        commands = ["sweep_overdue", "archive_tasks", "compact_tombstones"]
+        for name in commands:
+            call_command(
+                name, "--batch-size", "5", "--pause", "0.01", stdout=StringIO()
+            )
+            with self.assertRaises(CommandError):
+                call_command(name, "--batch-size", "0", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("purge_users", "nobody", "--batch-size", "0")
+        with self.assertRaises(CommandError):
+            call_command("rollup_completions", "--pause", "-1")
+
+
+class CompletionRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="worker", password="pw")
+        self.other = User.objects.create_user(username="archivist", password="pw")
+        self.day = timezone.localdate() - timedelta(days=1)
+        start, end = day_bounds(self.day)
+        done = start + timedelta(hours=12)
+        # hours to complete 1, 3 and 5: on time, late, without a deadline
+        for hours, planned in ((1, done + timedelta(hours=1)), (3, start), (5, None)):
+            task = Task.objects.create(
+                title="Done", text="Text", user=self.user, complete=True
+            )
+            Task.objects.filter(pk=task.pk).update_flags(
+                date_created=done - timedelta(hours=hours),
+                date_completion=done,
+                date_planned_completion=planned,
+            )
+        ArchivedTask.objects.create(
+            task_id=10_000,
+            user=self.other,
+            title="Old",
+            text="Text",
+            date_created=done - timedelta(hours=10),
+            date_completion=done,
+        )
+        # the day before and still open, not counted
+        Task.objects.create(title="Open", text="Text", user=self.user)
+        task = Task.objects.create(
+            title="Earlier", text="Text", user=self.user, complete=True
+        )
+        Task.objects.filter(pk=task.pk).update_flags(
+            date_completion=start - timedelta(minutes=1)
+        )
+
+    def test_rollup_day(self):
+        self.assertEqual(rollup_day(self.day), 4)
+        total = DailyCompletionRollup.objects.get(day=self.day, user=None)
+        self.assertEqual(total.completed, 4)
+        self.assertEqual(total.median_hours, 4.0)
+        self.assertAlmostEqual(total.p90_hours, 8.5)
+        self.assertEqual((total.with_deadline, total.on_time), (2, 1))
+        self.assertEqual(total.on_time_ratio, 0.5)
+        worker = DailyCompletionRollup.objects.get(day=self.day, user=self.user)
+        self.assertEqual((worker.completed, worker.median_hours), (3, 3.0))
+        archivist = DailyCompletionRollup.objects.get(day=self.day, user=self.other)
+        self.assertIsNone(archivist.on_time_ratio)
+        # rolling up again replaces the rows
+        rollup_day(self.day)
+        self.assertEqual(DailyCompletionRollup.objects.filter(day=self.day).count(), 3)
+
+    def test_command_is_incremental(self):
+        call_command("rollup_completions", stdout=StringIO())
+        days = set(
+            DailyCompletionRollup.objects.filter(user=None).values_list(
+                "day", flat=True
+            )
+        )
+        self.assertEqual(
+            days, {self.day - timedelta(days=1), self.day, timezone.localdate()}
+        )
+        out = StringIO()
+        call_command("rollup_completions", stdout=out)
+        self.assertIn("Rolled up 1 days", out.getvalue())
+
+    def test_dashboard_reads_only_rollups(self):
+        rollup_day(self.day)
+        staff = User.objects.create_user(username="staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("completion_stats"), {"days": "7"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [q for q in captured.captured_queries if '"core_task"' in q["sql"]]
+        )
+        self.assertEqual(response.context["completed"], 4)
+        self.assertEqual(
+            [row["user__username"] for row in response.context["users"]],
+            ["worker", "archivist"],
+        )
+        self.assertAlmostEqual(
+            response.context["users"][0]["median_hours"], 3.0, delta=0.3
+        )
+        self.assertContains(response, "50% of 2")
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("completion_stats"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_dashboard_median_spans_the_days(self):
+        # 0 (Earlier), 1, 3, 5 and three times 100 hours: the median is 5, the
+        # daily medians 100 and 3 weighted by completions would give 58
+        start, end = day_bounds(self.day - timedelta(days=1))
+        for i in range(3):
+            task = Task.objects.create(
+                title="Slow", text="Text", user=self.user, complete=True
+            )
+            Task.objects.filter(pk=task.pk).update_flags(
+                date_created=start - timedelta(hours=99),
+                date_completion=start + timedelta(hours=1),
+            )
+        rollup_day(self.day - timedelta(days=1))
+        rollup_day(self.day)
+        staff = User.objects.create_user(username="staff", password="pw", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("completion_stats"), {"days": "7"})
+        worker = response.context["users"][0]
+        self.assertEqual(worker["completed"], 7)
+        self.assertAlmostEqual(worker["median_hours"], 5.0, delta=0.5)
+
+    def test_histogram_percentile(self):
+        hours = np.array([0.0, 0.5, 2.0, 2.0, 40.0])
+        counts = histogram(hours)
+        self.assertEqual(sum(counts.values()), 5)
+        self.assertAlmostEqual(histogram_percentile([counts], 0.5), 2.0, delta=0.2)
+        # merging two days is the histogram of all their hours
+        merged = histogram_percentile([histogram(hours[:2]), histogram(hours[2:])], 0.5)
+        self.assertEqual(merged, histogram_percentile([counts], 0.5))
+        self.assertIsNone(histogram_percentile([{}], 0.5))
+
+
 class CustomLoginViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -167,14 +1763,40 @@ class AdminUserListTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
     def test_get_queryset(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login(username="testuser", password="testpassword")
         response = self.client.get(reverse("userlist"))
-        queryset = response.context["object_list"]
-        self.assertEqual(queryset.model, User)
-        self.assertIn("COUNT(", str(queryset.query))
-        self.assertIn("task", str(queryset.query))
-        self.assertIn("complete", str(queryset.query))
-        self.assertIn("incomplete_task_count", str(queryset.query))
-        self.assertIn("ORDER BY", str(queryset.query))
+        queryset = response.context["view"].get_queryset()
+        self.assertEqual(queryset.model, TaskStats)
+        self.assertNotIn("COUNT(", str(queryset.query))
+        self.assertIn('"core_taskstats"."overdue" > 0', str(queryset.query))
+
+    # only users with expired tasks, sorted and paged without counting all users
+    def test_lists_only_users_with_overdue_tasks(self):
+        self.user.is_staff = True
+        self.user.save()
+        past = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            user = User.objects.create_user(username=f"user{i}", password="x")
+            for j in range(i):
+                Task.objects.create(
+                    title="Test Title",
+                    text="Test Text",
+                    user=user,
+                    date_planned_completion=past,
+                )
+        self.client.login(username="testuser", password="testpassword")
+        with patch.object(AdminUserList, "page_size", 2):
+            response = self.client.get(reverse("userlist"))
+            first = [stats.overdue for stats in response.context["object_list"]]
+            response = self.client.get(
+                reverse("userlist")
+                + f"?sort=overdue&cursor={response.context['next_cursor']}"
+            )
+            second = [stats.overdue for stats in response.context["object_list"]]
+        self.assertEqual(first + second, [4, 3, 2, 1])
+        self.assertIsNone(response.context["next_cursor"])
 
 
 class AdminUserListURLTest(TestCase):
@@ -0,0 +1,97 @@
+import hashlib
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+
+from .metrics import Counter, register
+
+# Token buckets in the cache for the views that hash passwords. Every POST takes
+# one token from the bucket of the client address and one from the bucket of
+# the username; an empty bucket answers 429 before the form is validated, so a
+# flood of login attempts cannot keep the workers busy with PBKDF2.
+
+THROTTLED = register(
+    Counter(
+        "todo_throttled_total",
+        "Requests rejected by the login throttle by scope and bucket.",
+        labels=("scope", "bucket"),
+    )
+)
+
+# (name, value, capacity, seconds to refill an empty bucket)
+Bucket = Tuple[str, str, int, float]
+
+
+def _key(scope: str, bucket: str, value: str) -> str:
+    # usernames can contain anything, the cache key gets a digest
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f"throttle:{scope}:{bucket}:{digest}"
+
+
+def client_ip(request: HttpRequest) -> str:
+    # behind N trusted reverse proxies the client is the Nth address from the
+    # right of X-Forwarded-For, every proxy appends the address it got the
+    # request from; anything further left is made up by the client
+    proxies = settings.TRUSTED_PROXY_COUNT
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(",")]
+        if len(addresses) >= proxies and addresses[-proxies]:
+            return addresses[-proxies]
+    return request.META.get("REMOTE_ADDR") or "unknown"
+
+
+def take_tokens(
+    scope: str, buckets: List[Bucket], now: Optional[float] = None
+) -> float:
+    # returns 0 when a token was taken from every bucket, else the seconds until
+    # the next one is free. Not atomic: concurrent requests can both take the
+    # last token, close enough for bounding the hashing work.
+    now = time.time() if now is None else now
+    keys = [_key(scope, name, value) for name, value, capacity, period in buckets]
+    states: Dict[str, Tuple[float, float]] = cache.get_many(keys)
+    updated = {}
+    wait = 0.0
+    for key, (name, value, capacity, period) in zip(keys, buckets):
+        tokens, last = states.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * capacity / period)
+        if tokens < 1:
+            THROTTLED.inc(scope, name)
+            wait = max(wait, (1 - tokens) * period / capacity)
+        updated[key] = (tokens - 1, now)
+    if wait:
+        return wait
+    # a bucket untouched for a full period is full again anyway
+    cache.set_many(updated, math.ceil(max(period for *_, period in buckets)))
+    return 0.0
+
+
+class ThrottleMixin:
+    # for views whose POST hashes a password, checked before the form is built
+    throttle_scope = "login"
+
+    def throttle_buckets(self) -> List[Bucket]:
+        buckets = [
+            ("ip", client_ip(self.request), *settings.LOGIN_THROTTLE_IP),
+        ]
+        username = self.request.POST.get("username", "").strip().lower()
+        if username:
+            buckets.append(("username", username, *settings.LOGIN_THROTTLE_USERNAME))
+        return buckets
+
+    def post(self, request, *args, **kwargs):
+        if settings.LOGIN_THROTTLE:
+            wait = take_tokens(self.throttle_scope, self.throttle_buckets())
+            if wait:
+                response = HttpResponse(
+                    "Too many attempts, try again later.",
+                    status=429,
+                    content_type="text/plain; charset=utf-8",
+                )
+                response["Retry-After"] = str(math.ceil(wait))
+                return response
+        return super().post(request, *args, **kwargs)
@@ -9,6 +9,26 @@ from .views import (
     TaskDeleteView,
     TaskDetailView,
     AdminUserList,
+    TaskExportView,
+    TaskImportView,
+    TaskSearchView,
+    MetricsView,
+    CompletionStatsView,
+    ArchivedTaskListView,
+    TaskBulkActionView,
+)
+from .api import (
+    TaskListApi,
+    TaskBatchCreateApi,
+    TaskBatchUpdateApi,
+    TaskBatchDeleteApi,
+    TaskSyncApi,
+)
+from .async_views import (
+    AsyncTaskListView,
+    AsyncTaskDetailView,
+    AsyncTaskListApi,
+    AsyncTaskSyncApi,
 )
 from django.contrib.auth.views import LogoutView
 
@@ -16,11 +36,37 @@ urlpatterns = [
     path("", HomeView.as_view(), name="home"),
     path("add_task", TaskCreateView.as_view(), name="add_task"),
     path("task", TaskListView.as_view(), name="task"),
+    path("archived_task", ArchivedTaskListView.as_view(), name="archived_task"),
     path("edit_task/<int:pk>", TaskUpdateView.as_view(), name="edit_task"),
     path("login/", CustomLoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(next_page="login"), name="logout"),
     path("register/", CustomRegisterView.as_view(), name="register"),
+    path("bulk_task", TaskBulkActionView.as_view(), name="bulk_task"),
     path("delete_task/<int:pk>", TaskDeleteView.as_view(), name="delete_task"),
     path("detail_task/<int:pk>", TaskDetailView.as_view(), name="detail_task"),
     path("userlist", AdminUserList.as_view(), name="userlist"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("completion_stats", CompletionStatsView.as_view(), name="completion_stats"),
+    path("search_task", TaskSearchView.as_view(), name="search_task"),
+    path("export_task", TaskExportView.as_view(), name="export_task"),
+    path("import_task", TaskImportView.as_view(), name="import_task"),
+    path("async/task", AsyncTaskListView.as_view(), name="async_task"),
+    path(
+        "async/detail_task/<int:pk>",
+        AsyncTaskDetailView.as_view(),
+        name="async_detail_task",
+    ),
+    path("api/async/tasks", AsyncTaskListApi.as_view(), name="api_async_tasks"),
+    path("api/async/tasks/sync", AsyncTaskSyncApi.as_view(), name="api_async_sync"),
+    path("api/tasks", TaskListApi.as_view(), name="api_tasks"),
+    path("api/tasks/sync", TaskSyncApi.as_view(), name="api_sync"),
+    path(
+        "api/tasks/batch_create", TaskBatchCreateApi.as_view(), name="api_batch_create"
+    ),
+    path(
+        "api/tasks/batch_update", TaskBatchUpdateApi.as_view(), name="api_batch_update"
+    ),
+    path(
+        "api/tasks/batch_delete", TaskBatchDeleteApi.as_view(), name="api_batch_delete"
+    ),
 ]
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
 from django.views.generic import (
+    View,
     TemplateView,
     CreateView,
     ListView,
@@ -9,27 +10,119 @@ from django.views.generic import (
     DeleteView,
     DetailView,
 )
-from .models import Task, User
-from .forms import TaskForm, TaskUpdateForm
+from .models import ArchivedTask, DailyCompletionRollup, Task, TaskStats, User
+from .forms import (
+    TaskBulkActionForm,
+    TaskForm,
+    TaskUpdateForm,
+    TaskImportForm,
+    task_length_errors,
+)
+from .pagination import paginate_keyset
+from .export import EXPORT_FORMATS, iter_export
+from .importer import import_tasks
+from .search import search_tasks
+from .analytics import histogram_percentile
+from .cache import (
+    get_task_list,
+    get_task_object,
+    set_task_list,
+    set_task_object,
+    task_list_key,
+    task_object_key,
+)
+from .routers import pinned_to_primary, read_from_replica
+from .writes import run_write
+from .metrics import render_metrics
+from .throttle import ThrottleMixin
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+from django.utils.cache import patch_cache_control
+from django.conf import settings
+import time
+from datetime import datetime, timedelta
+import io
+from collections import defaultdict
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 from django.contrib import messages
-from datetime import datetime
-from django.db.models import Count, Q
 from typing import Type, TypeVar, List, Dict, Union
 from . import models
-from django.db.models import QuerySet
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
 
 # Create your views here.
 
 
+# Read only views: GET and HEAD read from the replica unless the client wrote
+# a moment ago (pin cookie), then the primary is read so the change is visible.
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ("GET", "HEAD") and not pinned_to_primary(request):
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+# Form views saving a task: with TASK_WRITE_COALESCING the save runs in the
+# batched writer thread (core/writes.py), the response waits for its commit.
+class CoalescedSaveMixin:
+    def form_valid(self, form):
+        self.object = run_write(form.save)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+# Detail, edit and delete of one task: only the tasks of the logged in user
+# (index task_user_id_idx). GET and HEAD read through the per user task cache,
+# so the detail -> edit pages read the row once until it is written. Writes
+# always load the row, a cached copy may miss a change made by another process
+# (archive_tasks, sweep_overdue) and saving it would bring old state back.
+class OwnedTaskMixin(LoginRequiredMixin):
+    def get_queryset(self) -> QuerySet:
+        return Task.objects.filter(user=self.request.user)
+
+    def get_object(self, queryset=None) -> Task:
+        if queryset is None and getattr(self, "_owned_task", None) is not None:
+            return self._owned_task
+        if self.request.method not in ("GET", "HEAD"):
+            return super().get_object(queryset)
+        key = task_object_key(self.request.user.pk, self.kwargs[self.pk_url_kwarg])
+        task = get_task_object(key) if queryset is None else None
+        if task is None:
+            task = super().get_object(queryset)
+            set_task_object(key, task)
+        if queryset is None:
+            self._owned_task = task
+        return task
+
+
+# The pages show "time until deadline" texts that change while the rows do not,
+# validators include this window so a cached page is revalidated from time to time.
+def render_window() -> int:
+    return int(time.time() // settings.TASK_LIST_CACHE_TIMEOUT)
+
+
+# Conditional GET with the etag() and last_modified() of the view. The browser
+# must revalidate every time (private, no-cache), and while flash messages wait
+# the page is rendered in full, a 304 would drop them.
+def revalidated_get(view, get, request, *args, **kwargs) -> HttpResponse:
+    if not len(messages.get_messages(request)):
+        get = condition(etag_func=view.etag, last_modified_func=view.last_modified)(get)
+    response = get(request, *args, **kwargs)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class HomeView(TemplateView):
     template_name = "home.html"
 
 
-class TaskCreateView(CreateView):
+class TaskCreateView(CoalescedSaveMixin, CreateView):
     model: Type[Task] = Task
     form_class: Type[TaskForm] = TaskForm
     template_name = "add_task.html"
@@ -39,11 +132,9 @@ class TaskCreateView(CreateView):
     def form_valid(self, form: TaskForm) -> bool:
         title = form.cleaned_data.get("title")
         text = form.cleaned_data.get("text")
-        if len(title) < 4:
-            messages.error(self.request, "Title must be at least 4 characters long")
-            return self.form_invalid(form)
-        if len(text) < 10:
-            messages.error(self.request, "Text must be at least 10 characters long")
+        errors = task_length_errors(title, text)
+        if errors:
+            messages.error(self.request, errors[0])
             return self.form_invalid(form)
         form.instance.user = self.request.user
         response = super().form_valid(form)
@@ -51,29 +142,88 @@ class TaskCreateView(CreateView):
         return response
 
 
-class TaskListView(LoginRequiredMixin, ListView):
+class TaskListView(ReplicaReadMixin, LoginRequiredMixin, ListView):
     model: Type[Task] = Task
     template_name = "task.html"
-    ordering = ["date_planned_completion"]
+    ordering = ["complete", "date_planned_completion", "pk"]
     context_object_name = "tasks"
+    page_size = 50
+
+    # Conditional GET: the TaskStats row of the user changes with every write to
+    # its tasks, so one primary key lookup answers a poll with 304 Not Modified
+    # before any task is loaded or the template is rendered.
+    def get(self, request, *args, **kwargs):
+        self.stats = TaskStats.for_user(request.user)
+        return revalidated_get(self, super().get, request, *args, **kwargs)
+
+    def etag(self, request, *args, **kwargs) -> str:
+        cursor = request.GET.get("cursor", "")
+        updated = self.stats.updated_at.timestamp()
+        return f"{updated}-{self.stats.total}-{cursor}-{render_window()}"
 
+    def last_modified(self, request, *args, **kwargs) -> datetime:
+        return self.stats.updated_at
+
+    # only tasks of the current user, the ordering is the same like the index
+    # (user, complete, date_planned_completion, id) so every page is an index range
     def get_queryset(self) -> QuerySet:
-        queryset = super().get_queryset()
-        queryset = queryset.order_by("complete", "date_planned_completion")
-        return queryset
+        return self.model.objects.filter(user=self.request.user)
 
     # Return dictionary is because tasks will set string username of current user
     # count will set like integer nuber of complete task
     # done will set like integer number of incomplete task
+    # next_cursor is the keyset cursor of the next page or None on the last page
+    # task_rows are the rendered rows, the whole page is cached under the task
+    # version of the user so repeated reads run no task queries at all
     def get_context_data(self, **kwargs) -> Dict[str, int]:
         context = super().get_context_data(**kwargs)
-        context["tasks"] = context["tasks"].filter(user=self.request.user)
-        context["count"] = context["tasks"].filter(complete=False).count()
-        context["done"] = context["tasks"].filter(complete=True).count()
+        cursor = self.request.GET.get("cursor")
+        user_id = self.request.user.pk
+        key = task_list_key(user_id, cursor)
+        page = get_task_list(key)
+        if page is None:
+            tasks, next_cursor = paginate_keyset(
+                context["tasks"], self.ordering, cursor, self.page_size
+            )
+            # read by get() for the ETag already
+            page = {
+                "tasks": tasks,
+                "next_cursor": next_cursor,
+                "count": self.stats.incomplete,
+                "done": self.stats.complete,
+                "task_rows": render_to_string(
+                    "task_rows.html", {"tasks": tasks}, self.request
+                ),
+            }
+            set_task_list(key, page)
+        context.update(page)
+        context["task_rows"] = mark_safe(page["task_rows"])
+        context["cursor"] = cursor
         return context
 
 
-class TaskUpdateView(UpdateView):
+class ArchivedTaskListView(ReplicaReadMixin, LoginRequiredMixin, ListView):
+    model: Type[ArchivedTask] = ArchivedTask
+    template_name = "archived_task.html"
+    ordering = ["-date_completion", "-task_id"]
+    context_object_name = "tasks"
+    page_size = 50
+
+    def get_queryset(self) -> QuerySet:
+        return self.model.objects.filter(user=self.request.user)
+
+    # keyset pages on (user, -date_completion, -task_id), the archive is never counted
+    def get_context_data(self, **kwargs) -> Dict[str, Union[str, None]]:
+        context = super().get_context_data(**kwargs)
+        cursor = self.request.GET.get("cursor")
+        context["tasks"], context["next_cursor"] = paginate_keyset(
+            context["tasks"], self.ordering, cursor, self.page_size
+        )
+        context["cursor"] = cursor
+        return context
+
+
+class TaskUpdateView(OwnedTaskMixin, CoalescedSaveMixin, UpdateView):
     model: Type[Task] = Task
     form_class: Type[TaskUpdateForm] = TaskUpdateForm
     template_name = "edit_task.html"
@@ -83,11 +233,9 @@ class TaskUpdateView(UpdateView):
     def form_valid(self, form: TaskUpdateForm) -> bool:
         title = form.cleaned_data.get("title")
         text = form.cleaned_data.get("text")
-        if len(title) < 4:
-            messages.error(self.request, "Title must be at least 4 characters long")
-            return self.form_invalid(form)
-        if len(text) < 10:
-            messages.error(self.request, "Text must be at least 10 characters long")
+        errors = task_length_errors(title, text)
+        if errors:
+            messages.error(self.request, errors[0])
             return self.form_invalid(form)
         form.instance.user = self.request.user
         response = super().form_valid(form)
@@ -95,24 +243,124 @@ class TaskUpdateView(UpdateView):
         return response
 
 
-class TaskDetailView(DetailView):
+class TaskDetailView(ReplicaReadMixin, OwnedTaskMixin, DetailView):
     template_name = "detail_task.html"
     model: Type[Task] = Task
     context_object_name = "task"
 
+    # Conditional GET on Task.updated_at of the cached task, a 304 usually
+    # needs no task query at all
+    def get(self, request, *args, **kwargs):
+        self.updated_at = self.get_object().updated_at
+        return revalidated_get(self, super().get, request, *args, **kwargs)
 
-class TaskDeleteView(DeleteView):
+    def etag(self, request, *args, **kwargs) -> str:
+        return f"{kwargs['pk']}-{self.updated_at.timestamp()}-{render_window()}"
+
+    def last_modified(self, request, *args, **kwargs) -> datetime:
+        return self.updated_at
+
+
+class TaskDeleteView(OwnedTaskMixin, DeleteView):
     model: Type[Task] = Task
     context_object_name = "task"
     template_name = "delete_task.html"
     success_url = reverse_lazy("task")
 
-    def get_queryset(self) -> QuerySet:
-        owner = self.request.user
-        return self.model.objects.filter(user=owner)
 
+class TaskBulkActionView(LoginRequiredMixin, FormView):
+    form_class: Type[TaskBulkActionForm] = TaskBulkActionForm
+    http_method_names = ["post"]
+    success_url = reverse_lazy("task")
+
+    # one UPDATE or DELETE for all selected tasks of the user, the counters and
+    # the cache version change once for the whole selection
+    def form_valid(self, form: TaskBulkActionForm):
+        tasks = Task.objects.filter(
+            user=self.request.user, pk__in=form.cleaned_data["tasks"]
+        )
+        action = form.cleaned_data["action"]
+        if action == "delete":
+            count = tasks.delete()[1].get(Task._meta.label, 0)
+            messages.success(self.request, f"Deleted {count} tasks")
+        elif action == "complete":
+            count = tasks.update(complete=True)
+            messages.success(self.request, f"Completed {count} tasks")
+        else:
+            count = tasks.update(
+                date_planned_completion=form.cleaned_data["date_planned_completion"]
+            )
+            messages.success(self.request, f"Changed the deadline of {count} tasks")
+        return super().form_valid(form)
+
+    def form_invalid(self, form: TaskBulkActionForm):
+        for errors in form.errors.values():
+            messages.error(self.request, errors[0])
+        return redirect(self.success_url)
 
-class CustomLoginView(LoginView):
+
+class TaskSearchView(LoginRequiredMixin, TemplateView):
+    template_name = "search_task.html"
+
+    # ranked results with snippets, only tasks of the current user
+    def get_context_data(self, **kwargs) -> Dict[str, Union[str, List[Task]]]:
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "")
+        context["query"] = query
+        context["tasks"] = search_tasks(self.request.user, query)
+        return context
+
+
+class TaskExportView(LoginRequiredMixin, View):
+    # ?format=ndjson|csv, staff can export the tasks of all users with ?all=1
+    def get(self, request, *args, **kwargs) -> StreamingHttpResponse:
+        export_format = request.GET.get("format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            export_format = "ndjson"
+        queryset = Task.objects.all()
+        archived = ArchivedTask.objects.all()
+        if request.GET.get("all"):
+            if not request.user.is_staff:
+                raise PermissionDenied
+        else:
+            queryset = queryset.filter(user=request.user)
+            archived = archived.filter(user=request.user)
+        response = StreamingHttpResponse(
+            iter_export(queryset, export_format, archived),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tasks.{export_format}"'
+        )
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, FormView):
+    template_name = "import_task.html"
+    form_class: Type[TaskImportForm] = TaskImportForm
+
+    # the result is rendered on the same page, rows with errors are listed with line numbers
+    def form_valid(self, form: TaskImportForm):
+        # utf-8-sig drops the byte order mark of spreadsheet exports
+        stream = io.TextIOWrapper(form.cleaned_data["file"], encoding="utf-8-sig")
+        result = import_tasks(stream, self.request.user, form.cleaned_data["format"])
+        if result.read_error:
+            # the batches before the error are committed, say how far it got
+            line_number, error = result.read_error
+            messages.error(
+                self.request,
+                f"File could not be read after line {line_number} ({error}). "
+                f"Imported {result.created} tasks from the lines before, "
+                "the rest of the file was not imported.",
+            )
+        elif result.created:
+            messages.success(self.request, f"Imported {result.created} tasks")
+        return self.render_to_response(
+            self.get_context_data(form=form, errors=result.errors, result=result)
+        )
+
+
+class CustomLoginView(ThrottleMixin, LoginView):
     template_name = "login.html"
     fields = "__all__"
     redirect_authenticated_user = True
@@ -122,8 +370,9 @@ class CustomLoginView(LoginView):
         return reverse_lazy("task")
 
 
-class CustomRegisterView(FormView):
+class CustomRegisterView(ThrottleMixin, FormView):
     template_name = "register.html"
+    throttle_scope = "register"
     form_class: Type[UserCreationForm] = UserCreationForm
     redirect_authenticated_user = True
     success_url = reverse_lazy("task")
@@ -140,28 +389,102 @@ class CustomRegisterView(FormView):
         return super(CustomRegisterView, self).get(*args, **kwargs)
 
 
-class AdminUserList(UserPassesTestMixin, ListView):
-    model: Type[User] = User
+class AdminUserList(ReplicaReadMixin, UserPassesTestMixin, ListView):
+    model: Type[TaskStats] = TaskStats
     template_name = "admin.html"
-    
+    page_size = 50
+    # ?sort= value -> ordering, every one is backed by an index on TaskStats
+    sort_orderings = {
+        "overdue": ["-overdue", "-pk"],
+        "total": ["-total", "-pk"],
+        "complete": ["-complete", "-pk"],
+        "incomplete": ["-incomplete", "-pk"],
+    }
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    # only users with expired tasks are listed, filtered in SQL from the TaskStats
+    # counters instead of annotating every user and dropping rows in the template
+    def get_queryset(self) -> QuerySet:
+        return self.model.objects.filter(overdue__gt=0).select_related("user")
+
+    # keyset paging, no COUNT(*) of all users is needed to render a page
+    def get_context_data(self, **kwargs) -> Dict[str, Union[str, None]]:
+        context = super().get_context_data(**kwargs)
+        sort = self.request.GET.get("sort")
+        if sort not in self.sort_orderings:
+            sort = "overdue"
+        cursor = self.request.GET.get("cursor")
+        context["object_list"], context["next_cursor"] = paginate_keyset(
+            context["object_list"], self.sort_orderings[sort], cursor, self.page_size
+        )
+        context["sort"] = sort
+        context["cursor"] = cursor
+        return context
+
+
+class CompletionStatsView(ReplicaReadMixin, UserPassesTestMixin, TemplateView):
+    # Completion throughput of the last ?days= days, read only from the daily
+    # rollups that rollup_completions writes, never from the task tables
+    template_name = "completion_stats.html"
+    default_days = 30
+    max_days = 366
+    user_limit = 50
+
     def test_func(self):
         return self.request.user.is_staff
 
-    def get_queryset(self) -> List[User]:
-        queryset = super().get_queryset()
-        queryset = queryset.annotate(task_count=Count("task"))
-        queryset = queryset.annotate(
-            complete_task_count=Count("task", filter=Q(task__complete=True))
+    def get_days(self) -> int:
+        try:
+            days = int(self.request.GET.get("days", self.default_days))
+        except ValueError:
+            days = self.default_days
+        return min(max(days, 1), self.max_days)
+
+    def get_context_data(self, **kwargs) -> Dict[str, Union[int, List]]:
+        context = super().get_context_data(**kwargs)
+        days = self.get_days()
+        rollups = DailyCompletionRollup.objects.filter(
+            day__gt=timezone.localdate() - timedelta(days=days)
         )
-        queryset = queryset.annotate(
-            uncomplete_task_count=Count("task", filter=Q(task__complete=False))
+        totals = list(rollups.filter(user=None).order_by("-day"))
+        users = list(
+            rollups.filter(user__isnull=False)
+            .values("user_id", "user__username")
+            .annotate(
+                completed=Sum("completed"),
+                with_deadline=Sum("with_deadline"),
+                on_time=Sum("on_time"),
+            )
+            .order_by("-completed", "user_id")[: self.user_limit]
         )
-        queryset = queryset.annotate(
-            incomplete_task_count=Count(
-                "task",
-                filter=Q(task__complete=False)
-                & Q(task__date_planned_completion__lt=datetime.now()),
+        # the median of all the days, from the merged daily histograms
+        histograms = defaultdict(list)
+        for user_id, counts in rollups.filter(
+            user_id__in=[row["user_id"] for row in users]
+        ).values_list("user_id", "hours_histogram"):
+            histograms[user_id].append(counts)
+        for row in users:
+            row["on_time_ratio"] = (
+                row["on_time"] / row["with_deadline"] if row["with_deadline"] else None
             )
+            row["median_hours"] = histogram_percentile(histograms[row["user_id"]], 0.5)
+        context.update(
+            days=days,
+            totals=totals,
+            users=users,
+            completed=sum(day.completed for day in totals),
+        )
+        return context
+
+
+class MetricsView(UserPassesTestMixin, View):
+    # Prometheus scrape target, collected by core.metrics.MetricsMiddleware
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        return HttpResponse(
+            render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
         )
-        queryset = queryset.order_by("-incomplete_task_count")
-        return queryset
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .metrics import Histogram, register
+
+# SQLite has one writer at a time. Connections are put in WAL mode with a busy
+# timeout, transactions begin IMMEDIATE (core.backends.sqlite3) so that timeout
+# covers them too, and with TASK_WRITE_COALESCING the task writes of the form views are
+# handed to one writer thread that commits whatever arrived within a few
+# milliseconds in a single transaction, instead of every request fighting for
+# the lock with its own transaction.
+
+WRITE_BATCH_SIZE = register(
+    Histogram(
+        "todo_write_batch_size",
+        "Task writes committed together by the write coalescer.",
+        labels=(),
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+    )
+)
+WRITE_WAIT_SECONDS = register(
+    Histogram(
+        "todo_write_wait_seconds",
+        "Time from handing a write to the coalescer until its commit.",
+        labels=(),
+    )
+)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    # connection_created handler
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT)}")
+        if settings.SQLITE_WAL:
+            # readers do not block the writer and the other way round
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+
+
+class WriteCoalescer:
+    def __init__(self, max_batch: int = 50, max_wait: float = 0.005):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: "queue.Queue[Tuple[Callable[[], Any], Future, float]]" = (
+            queue.Queue()
+        )
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, write: Callable[[], Any]) -> Any:
+        # blocks until the batch with this write is committed, returns its result
+        self.start()
+        future: Future = Future()
+        self.queue.put((write, future, time.perf_counter()))
+        return future.result()
+
+    def start(self) -> None:
+        with self.lock:
+            # started lazily, also again in a forked worker process
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="task-write-coalescer", daemon=True
+                )
+                self.thread.start()
+
+    def collect(self) -> List[Tuple[Callable[[], Any], Future, float]]:
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self) -> None:
+        while True:
+            batch = self.collect()
+            close_old_connections()
+            self.commit(batch)
+
+    def commit(self, batch: List[Tuple[Callable[[], Any], Future, float]]) -> None:
+        results = []
+        try:
+            with transaction.atomic():
+                for write, future, queued in batch:
+                    # a failing write only rolls back its own savepoint
+                    try:
+                        with transaction.atomic():
+                            results.append((write(), None))
+                    except Exception as exc:
+                        results.append((None, exc))
+        except Exception as exc:
+            connection.close()
+            for write, future, queued in batch:
+                future.set_exception(exc)
+            return
+        committed = time.perf_counter()
+        WRITE_BATCH_SIZE.observe(value=len(batch))
+        for (write, future, queued), (result, exc) in zip(batch, results):
+            WRITE_WAIT_SECONDS.observe(value=committed - queued)
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+coalescer = WriteCoalescer(settings.TASK_WRITE_BATCH_SIZE, settings.TASK_WRITE_MAX_WAIT)
+
+
+def run_write(write: Callable[[], Any]) -> Any:
+    if settings.TASK_WRITE_COALESCING:
+        return coalescer.submit(write)
+    return write()
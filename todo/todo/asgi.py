@@ -5,6 +5,29 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
+
+Serving under ASGI, run from the directory with manage.py:
+
+    pip install "uvicorn[standard]"
+    WEB_CONCURRENCY=2 TODO_REDIS_URL=redis://localhost:6379/0 \
+        uvicorn todo.asgi:application --host 0.0.0.0 --port 8000
+
+or with daphne:
+
+    daphne -b 0.0.0.0 -p 8000 todo.asgi:application
+
+The live task list updates (Server-Sent Events on /events, core/sse.py) are
+only served here, not by runserver or WSGI servers. Set the worker count with
+WEB_CONCURRENCY rather than --workers: with more than one worker the settings
+switch the events to core.events.CacheBackend, which needs a cache the workers
+share (TODO_REDIS_URL). With the in-process backend a client only gets the
+events of writes its own worker served.
+
+The views in core/async_views.py (/async/task, /async/detail_task/<pk>,
+/api/async/tasks, /api/async/tasks/sync) run on the event loop, so one worker
+keeps many slow clients open at once. Sync views still work but every request
+holds a thread of the worker pool for its whole duration. Static files are not
+served by the ASGI application, put a proxy in front of it or collect them.
 """
 
 import os
@@ -13,4 +36,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported after Django is set up
+from core.sse import EVENTS_PATH, task_events_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == EVENTS_PATH:
+        return await task_events_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,8 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so the whole request is measured (staff can read /metrics)
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # only with STATIC_PRODUCTION, answers before sessions and auth are loaded
+    "core.staticfiles.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # read your writes with a replica, see core/routers.py
+    "core.routers.ReplicaPinMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -54,9 +61,9 @@ ROOT_URLCONF = "todo.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that adds render time to the request metrics
+        "BACKEND": "core.metrics.TimedDjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -64,6 +71,17 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # templates are compiled once per process, runserver resets the
+            # cache when a template file changes
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
         },
     },
 ]
@@ -74,17 +92,126 @@ WSGI_APPLICATION = "todo.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# core.backends.sqlite3 begins transactions IMMEDIATE, see core/backends/sqlite3
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "core.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
 
+# Read replica for the read only views (core.routers). Set TODO_REPLICA_DB to a
+# database file; locally a copy of db.sqlite3 stands in for a real replica:
+#   cp db.sqlite3 replica.sqlite3 && TODO_REPLICA_DB=replica.sqlite3 python manage.py runserver
+REPLICA_DATABASE = None
+if os.environ.get("TODO_REPLICA_DB"):
+    REPLICA_DATABASE = "replica"
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["TODO_REPLICA_DB"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# SQLite connection setup (core.writes.configure_sqlite): milliseconds a writer
+# waits for the lock before "database is locked", and WAL journal mode.
+SQLITE_BUSY_TIMEOUT = 5000
+SQLITE_WAL = True
+
+# Hand task writes of the form views to one writer thread that commits them in
+# batches of up to TASK_WRITE_BATCH_SIZE, collected for TASK_WRITE_MAX_WAIT
+# seconds. Meant for a single node on SQLite, off by default.
+TASK_WRITE_COALESCING = os.environ.get("TODO_WRITE_COALESCING") == "1"
+TASK_WRITE_BATCH_SIZE = 50
+TASK_WRITE_MAX_WAIT = 0.005
+
+# Live task list updates over Server-Sent Events (core/events.py, core/sse.py).
+# InProcessBackend serves one process, with several worker processes events go
+# through core.events.CacheBackend and a cache they all share (TODO_REDIS_URL).
+# WEB_CONCURRENCY is the worker count uvicorn and gunicorn start by default.
+TASK_EVENTS = True
+TASK_EVENTS_BACKEND = (
+    "core.events.CacheBackend"
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1
+    else "core.events.InProcessBackend"
+)
+# seconds between keep-alive comments on an idle event stream
+TASK_EVENTS_KEEPALIVE = 15
+
+# Seconds a client reads from the primary after a write request (signed cookie,
+# core.routers.ReplicaPinMiddleware), must be longer than the replication lag so
+# users always see their own writes.
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# The task list pages, the cached tasks, their per user versions and the login
+# throttle buckets are only right when every process sees the same cache: the
+# web workers and the management commands that write tasks (archive_tasks,
+# sweep_overdue, import_tasks, purge_users). LocMemCache is per process, good
+# for runserver and the tests only; with more processes set TODO_REDIS_URL
+# (needs the redis package) or TODO_CACHE_DIR (a directory all of them can
+# write). `manage.py check --deploy` warns about a per process cache.
+if os.environ.get("TODO_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["TODO_REDIS_URL"],
+        }
+    }
+elif os.environ.get("TODO_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["TODO_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a rendered task list page stays cached. Writes invalidate it right
+# away, the timeout only bounds how old the "time until deadline" texts get.
+TASK_LIST_CACHE_TIMEOUT = 60
+# Seconds a task stays cached for the detail, edit and delete pages, keyed by
+# the same per user version as the list.
+TASK_OBJECT_CACHE_TIMEOUT = 300
+
+# Days deleted tasks are kept for delta sync (api/tasks/sync), older cursors
+# get a reset. compact_tombstones deletes the rest.
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+# Seconds a finished sync is repeated by the next one, longer than a write can
+# wait for the lock (SQLITE_BUSY_TIMEOUT) between its timestamp and its commit.
+SYNC_OVERLAP_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
+# PBKDF2 as Django does it, with the hashing time in the metrics
+PASSWORD_HASHERS = [
+    "core.hashers.TimedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Token buckets of the login and register POSTs, (attempts, seconds to refill
+# them): per client address and per username. Rejected before any hashing.
+LOGIN_THROTTLE = True
+LOGIN_THROTTLE_IP = (30, 300)
+LOGIN_THROTTLE_USERNAME = (10, 300)
+# Reverse proxies in front of the app (nginx: 1) that append to X-Forwarded-For,
+# the client address for the throttle is read from that header then. Keep 0
+# when clients connect directly, or they can pick any address.
+TRUSTED_PROXY_COUNT = int(os.environ.get("TODO_TRUSTED_PROXIES", "0"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -118,6 +245,14 @@ USE_TZ = True
 
 LOGIN_URL = "login/"
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Production static files: run collectstatic with TODO_STATIC_PRODUCTION=1 to
+# get content hashed names with gzip (and brotli, if installed) variants, the
+# app then serves them itself with far-future caching.
+STATIC_PRODUCTION = os.environ.get("TODO_STATIC_PRODUCTION") == "1"
+if STATIC_PRODUCTION:
+    STATICFILES_STORAGE = "core.staticfiles.CompressedManifestStaticFilesStorage"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field